@@ -1,7 +1,7 @@
 import os
 
 __version__ = "0.10.0"
-__db_user_version__ = 2
+__db_user_version__ = 5
 
 CONFIG_FILE: str = os.path.join(os.path.expanduser("~"), ".titr", "titr.cfg")
 TITR_DB: str = os.path.join(os.path.expanduser("~"), ".titr", "titr.db")
@@ -1,8 +1,11 @@
-import configparser
+import copy
+import functools
 import os
+import pickle
 
 from dataclasses import dataclass, field
-from titr import CONFIG_FILE
+from typing import Optional
+from titr import CONFIG_FILE, __version__
 
 
 @dataclass
@@ -11,9 +14,10 @@ class Config:
     default_category: int = 0
     default_task: str = ""
     calendar_name: str = ""
-    skip_event_names: list[str] = field(default_factory=list)
-    skip_event_status: list[int] = field(default_factory=list)
+    skip_event_names: frozenset[str] = frozenset()
+    skip_event_status: frozenset[int] = frozenset()
     category_list: dict = field(default_factory=dict)
+    category_by_name: dict = field(default_factory=dict)
     task_list: dict = field(default_factory=dict)
     skip_all_day_events: bool = True
     max_duration: float = 9
@@ -24,6 +28,8 @@ class Config:
 
 def create_default_config():
     """Create a default configuration file"""
+    import configparser
+
     # Ensure we don't accidentally overwrite config
     if os.path.isfile(CONFIG_FILE):
         raise FileExistsError(f"Config file '{CONFIG_FILE}' already exists!")
@@ -71,27 +77,112 @@ def create_default_config():
 
 
 def load_config(config_file=CONFIG_FILE) -> Config:
-    """Load and validate configuration options."""
+    """Load and validate configuration options.
+
+    Parsed configurations are cached until the file is modified."""
     # look for a config file in the working directory
     # if it doesn't exist, create it with some default options
-    if not os.path.isfile(config_file):
+    try:
+        file_stat = os.stat(config_file)
+    except FileNotFoundError:
         config_file = create_default_config()
+        file_stat = os.stat(config_file)
+    config, warnings = _parse_config(
+        config_file, file_stat.st_mtime_ns, file_stat.st_size
+    )
+    # warnings are shown on every load, whether or not the config was cached
+    for warning in warnings:
+        print(warning)
+    # return a copy so callers can't modify the cached config
+    return copy.deepcopy(config)
+
+
+@functools.lru_cache(maxsize=4)
+def _parse_config(
+    config_file, mtime_ns: int, size: int
+) -> tuple[Config, tuple[str, ...]]:
+    """Parse a config file, returning the config and any warnings.
+    The modification time and size are only used as keys for the cache.
+
+    The parsed config is also pickled next to the config file,
+    so that later runs of titr can skip parsing it."""
+    cache_file: str = f"{config_file}.cache"
+    cache_key: tuple = (__version__, mtime_ns, size)
+    cached: Optional[tuple[Config, tuple[str, ...]]] = _read_config_cache(
+        cache_file, cache_key
+    )
+    if cached is None:
+        warnings: list[str] = []
+        cached = _read_config_file(config_file, warnings), tuple(warnings)
+        _write_config_cache(cache_file, cache_key, cached)
+    config, warnings = cached
+    config.source_file = config_file
+    return config, warnings
+
+
+def _read_config_cache(
+    cache_file: str, cache_key: tuple
+) -> Optional[tuple[Config, tuple[str, ...]]]:
+    """Return the cached config and its warnings,
+    or None if the cache is missing or out of date."""
+    try:
+        with open(cache_file, "rb") as cache_handle:
+            cached_key, config, warnings = pickle.load(cache_handle)
+    except Exception:
+        # a bad cache is never fatal; parse the config file instead
+        return None
+    if cached_key != cache_key or not isinstance(config, Config):
+        return None
+    return config, warnings
+
+
+def _write_config_cache(
+    cache_file: str, cache_key: tuple, cached: tuple[Config, tuple[str, ...]]
+) -> None:
+    """Pickle a parsed config and its warnings. Written to a temporary
+    file and renamed, so a partially written cache is never read."""
+    temp_file: str = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, "wb") as cache_handle:
+            pickle.dump((cache_key, *cached), cache_handle)
+        os.replace(temp_file, cache_file)
+    except OSError as err:
+        print(f"Warning: Could not write config cache {cache_file}: {err}")
+
+
+def _read_config_file(config_file, warnings: list[str]) -> Config:
+    """Parse and validate the options in a config file.
+    Warnings about invalid options are added to the warnings list."""
+    # configparser is only needed when the config cache is out of date
+    import configparser
+
     config = Config()
     parser = configparser.ConfigParser()
-    parser.read(config_file)
+    with open(config_file) as config_file_handle:
+        parser.read_file(config_file_handle)
     for key in parser["categories"]:
         try:
             cat_key = int(key)
         except ValueError as err:
-            print(f"Warning: Skipped category key {key} in {config_file}: {err}")
+            warnings.append(
+                f"Warning: Skipped category key {key} in {config_file}: {err}"
+            )
             continue
         config.category_list[cat_key] = parser["categories"][key]
+
+    # reverse lookup of category keys by name; first key wins for duplicate names
+    config.category_by_name = {
+        name: key for key, name in reversed(config.category_list.items())
+    }
+
     for key in parser["tasks"]:
         if len(key) > 1:
-            print(f"Warning: Skipped task key {key} in {config_file}: len > 1.")
+            warnings.append(
+                f"Warning: Skipped task key {key} in {config_file}: len > 1."
+            )
             continue
         if key.isdigit():
-            print(f"Warning: Skipped task key {key} in {config_file}: Digit")
+            warnings.append(f"Warning: Skipped task key {key} in {config_file}: Digit")
             continue
         config.task_list[key] = parser["tasks"][key]
 
@@ -100,23 +191,19 @@ def load_config(config_file=CONFIG_FILE) -> Config:
     config.incidental_tasks = parser["incidental_tasks"]["keys"].split(", ")
     config.incidental_tasks = list(map(str.strip, config.incidental_tasks))
     if config.default_task not in config.task_list.keys():
-        print(
-            "Warning: Default tasks '",
-            config.default_task,
-            "' not found in ",
-            config_file,
+        warnings.append(
+            f"Warning: Default tasks ' {config.default_task} ' "
+            f"not found in  {config_file}"
         )
-        config.default_task = list(config.task_list.keys())[0]
+        config.default_task = next(iter(config.task_list))
 
     # TODO: Error handling for default category as not an int
     config.default_category = int(parser["general_options"]["default_category"])
     if config.default_category not in config.category_list.keys():
-        config.default_category = int(list(config.category_list.keys())[0])
-        print(
-            "Warning: Default category '",
-            config.default_category,
-            "'not found in ",
-            config_file,
+        config.default_category = int(next(iter(config.category_list)))
+        warnings.append(
+            f"Warning: Default category ' {config.default_category} '"
+            f"not found in  {config_file}"
         )
 
     # TODO: Error handling
@@ -125,13 +212,14 @@ def load_config(config_file=CONFIG_FILE) -> Config:
 
     config.outlook_account = parser["outlook_options"]["email"]
     config.calendar_name = parser["outlook_options"]["calendar_name"]
-    config.skip_event_names = [
+    # sets for constant time lookups when filtering outlook events
+    config.skip_event_names = frozenset(
         event.strip() for event in parser["outlook_options"]["skip_event_names"].split(",")
-    ]
+    )
     # TODO: Error handling
-    config.skip_event_status = [
+    config.skip_event_status = frozenset(
         int(status) for status in parser["outlook_options"]["skip_event_status"].split(",")
-    ]
+    )
     config.skip_all_day_events = parser.getboolean("outlook_options", "skip_all_day_events")
     # print(f"Loaded config from {config_file=}")
 
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import os
 import sys
 import sqlite3
@@ -6,59 +7,167 @@ from typing import Optional, Any
 
 from titr import TITR_DB, __db_user_version__, __version__
 
+SCHEMA_SQL: str = """--sql
+    -- Create time log table
+    CREATE TABLE IF NOT EXISTS time_log(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date DATE,
+        duration FLOAT,
+        category_id INT,
+        task_id INT,
+        session_id INT,
+        comment TEXT,
+        start_ts TIMESTAMP,
+        end_ts TIMESTAMP
+    );
+    -- Create category table
+    CREATE TABLE IF NOT EXISTS categories(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_key TEXT,
+        name TEXT
+    );
+    -- Create task table
+    CREATE TABLE IF NOT EXISTS tasks(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_key TEXT,
+        name TEXT
+    );
+    -- Create sessions table
+    CREATE TABLE IF NOT EXISTS sessions(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titr_version TEXT,
+        user TEXT,
+        platform TEXT,
+        ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        input_type TEXT
+    );
+"""
+
+# Index for date range queries on the time log
+TIME_LOG_INDEX: str = "idx_time_log_date_task"
+CREATE_TIME_LOG_INDEX: str = """--sql
+    CREATE INDEX IF NOT EXISTS {} ON time_log(date, task_id)
+""".format(
+    TIME_LOG_INDEX
+)
+# Index for summing the time log by category
+CATEGORY_INDEX: str = "idx_time_log_category_date"
+CREATE_CATEGORY_INDEX: str = """--sql
+    CREATE INDEX IF NOT EXISTS {} ON time_log(category_id, date)
+""".format(
+    CATEGORY_INDEX
+)
+# Partial index of timed activities that have not been ended yet
+OPEN_ENTRY_INDEX: str = "idx_time_log_open"
+CREATE_OPEN_ENTRY_INDEX: str = """--sql
+    CREATE INDEX IF NOT EXISTS {} ON time_log(id) WHERE duration = 0 AND end_ts IS NULL
+""".format(
+    OPEN_ENTRY_INDEX
+)
+# Secondary indexes of the time log, which can be rebuilt after bulk writes
+TIME_LOG_INDEXES: dict[str, str] = {
+    TIME_LOG_INDEX: CREATE_TIME_LOG_INDEX,
+    CATEGORY_INDEX: CREATE_CATEGORY_INDEX,
+    OPEN_ENTRY_INDEX: CREATE_OPEN_ENTRY_INDEX,
+}
+
+# Tables of user defined keys and names
+USER_TABLES: tuple[str, ...] = ("categories", "tasks")
+
+
+def _user_table_sql(statement: str) -> dict[str, str]:
+    """Fill in a statement for each user table, keyed by table name."""
+    return {table: statement.format(table) for table in USER_TABLES}
+
+
+# Statements are built once, rather than formatted on each call
+GET_PRIMARY_KEY: dict[str, str] = _user_table_sql(
+    """--sql
+    SELECT id FROM {} WHERE name=(?)
+"""
+)
+GET_PRIMARY_KEYS_BY_NAME: dict[str, str] = _user_table_sql(
+    "SELECT name, id FROM {} ORDER BY id DESC"
+)
+GET_IDS_BY_USER_KEY: dict[str, str] = _user_table_sql(
+    """--sql
+    SELECT user_key, id
+    FROM {}
+    WHERE user_key IS NOT NULL
+"""
+)
+INSERT_USER_KEY: dict[str, str] = _user_table_sql(
+    """--sql
+    INSERT INTO {} (user_key, name) VALUES (?, ?)
+"""
+)
+INSERT_NAME: dict[str, str] = _user_table_sql(
+    """--sql
+    INSERT INTO {} (name) VALUES (?)
+"""
+)
+WRITE_USER_KEY: dict[str, str] = _user_table_sql(
+    """--sql
+    REPLACE INTO {} (id, user_key, name) VALUES (?, ?, ?)
+"""
+)
+WRITE_NAME: dict[str, str] = _user_table_sql(
+    """--sql
+    INSERT OR REPLACE INTO {} (id, name) VALUES (?, ?)
+"""
+)
+ENFORCE_UNIQUE_KEYS: dict[str, str] = _user_table_sql(
+    """--sql
+    UPDATE {} SET user_key=null WHERE id != (?) AND user_key = (?)
+"""
+)
+# Placeholders for the keys and ids are filled in when the statement is used
+ENFORCE_UNIQUE_KEYS_BATCH: dict[str, str] = _user_table_sql(
+    """--sql
+    UPDATE {} SET user_key=null WHERE user_key IN ({{keys}}) AND id NOT IN ({{ids}})
+"""
+)
+
+WRITE_SESSION: str = """--sql
+    INSERT INTO sessions (titr_version, user, platform, input_type) VALUES (?, ?, ?, ?)
+"""
+WRITE_TIME_LOG: str = """--sql
+    INSERT INTO time_log (date, duration, category_id, task_id, comment, session_id, start_ts, end_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE_TIME_LOG: str = """--sql
+    UPDATE time_log SET (date, duration, category_id, task_id, comment, session_id, start_ts, end_ts) =
+    (?, ?, ?, ?, ?, ?, ?, ?)
+    WHERE id = (?)
+"""
+# Total deep work, and deep work since a given date
+GET_DEEP_WORK: str = """--sql
+    SELECT sum(duration), sum(CASE WHEN date>=(?) THEN duration END)
+    FROM time_log
+    WHERE category_id IN (SELECT id FROM categories WHERE name = 'Deep Work')
+"""
+
+
 ######################
 # DATABASE FUNCTIONS #
 ######################
 def db_initialize(database: str = TITR_DB) -> sqlite3.Connection:
     """Initialize the database, and create all tables."""
-    db_connection = sqlite3.connect(database)
+    # keep every statement titr uses prepared for the life of the connection
+    db_connection = sqlite3.connect(database, cached_statements=256)
     cursor = db_connection.cursor()
 
-    # Create time log table
-    time_log_table = """--sql
-        CREATE TABLE IF NOT EXISTS time_log(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date DATE,
-            duration FLOAT,
-            category_id INT,
-            task_id INT,
-            session_id INT,
-            comment TEXT,
-            start_ts TIMESTAMP,
-            end_ts TIMESTAMP
-        )
-    """
-    # Create category table
-    category_table = """--sql
-        CREATE TABLE IF NOT EXISTS categories(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_key TEXT,
-            name TEXT
-        )
-    """
-    # Create task table
-    task_table = """--sql
-        CREATE TABLE IF NOT EXISTS tasks(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_key TEXT,
-            name TEXT
-        )
-    """
-    # Create sessions table
-    session_table = """--sql
-        CREATE TABLE IF NOT EXISTS sessions(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            titr_version TEXT,
-            user TEXT,
-            platform TEXT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            input_type TEXT
-        )
-    """
+    # Write-ahead logging with normal sync avoids an fsync on every commit;
+    # at worst the last commit is lost on a power failure.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    # Larger page cache and memory-mapped reads for reports over the full log
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA mmap_size=268435456")
 
-    for table in [time_log_table, category_table, task_table, session_table]:
-        cursor.execute(table)
-    db_connection.commit()
+    # Create all tables in a single script
+    cursor.executescript(SCHEMA_SQL)
 
     # Check that version is correct
     cursor.execute("PRAGMA user_version")
@@ -75,11 +184,15 @@ def db_update_version(db_connection: sqlite3.Connection, user_version: int) -> i
     cursor = db_connection.cursor()
 
     print(f"Updating database from version {user_version} to {__db_user_version__}...")
+    # Run the whole upgrade in one transaction, rather than
+    # committing each schema change separately
+    if not db_connection.in_transaction:
+        cursor.execute("BEGIN")
 
-    def _get_column_names(table_name: str) -> list[str]:
+    def _get_column_names(table_name: str) -> frozenset[str]:
         """Get the column names from a table."""
         cursor.execute(f"PRAGMA table_info({table_name})")
-        return [col[1] for col in cursor.fetchall()]
+        return frozenset(col[1] for col in cursor)
 
     if user_version < 1:
         # Rename key to user_key in tasks
@@ -110,6 +223,21 @@ def db_update_version(db_connection: sqlite3.Connection, user_version: int) -> i
             print(" Add end_ts to time_log table...")
             cursor.execute("ALTER TABLE time_log ADD COLUMN end_ts TEXT")
 
+    if user_version < 3:
+        # Index time log by date for weekly and yearly reports
+        print(" Add date index to time_log table...")
+        cursor.execute(CREATE_TIME_LOG_INDEX)
+
+    if user_version < 4:
+        # Index entries started with --start, so --end doesn't scan the log
+        print(" Add open entry index to time_log table...")
+        cursor.execute(CREATE_OPEN_ENTRY_INDEX)
+
+    if user_version < 5:
+        # Index time log by category for deep work totals
+        print(" Add category index to time_log table...")
+        cursor.execute(CREATE_CATEGORY_INDEX)
+
     # Set the user version to the current version
     cursor.execute("PRAGMA user_version={}".format(__db_user_version__))
     db_connection.commit()
@@ -136,92 +264,110 @@ def db_populate_user_table(
     # Search the table and find the id of the item with a matching name
     cursor = db_connection.cursor()
 
-    get_primary_key: str = """--sql
-        SELECT id FROM {} WHERE name=(?)
-    """.format(
-        table
-    )
-    cursor.execute(get_primary_key, [value])
+    cursor.execute(GET_PRIMARY_KEY[table], [value])
     primary_key_query: Optional[tuple] = cursor.fetchone()
 
-    # If no result, create a new table row
+    # If no result, create a new table row, and let sqlite assign its id
     if primary_key_query is None:
-        get_last_key: str = "SELECT MAX(id) from {}".format(table)
-        cursor.execute(get_last_key, [])
-        last_key: tuple[Optional[int]] = cursor.fetchone()
-        # start at zero if table is empty:7
-        primary_key: int = 0 if last_key[0] is None else last_key[0] + 1
+        if user_key is not None:
+            cursor.execute(INSERT_USER_KEY[table], [user_key, value])
+        else:
+            cursor.execute(INSERT_NAME[table], [value])
+        primary_key: int = cursor.lastrowid
     else:
         primary_key = primary_key_query[0]
+        if user_key is not None:
+            cursor.execute(WRITE_USER_KEY[table], [primary_key, user_key, value])
+        else:
+            cursor.execute(WRITE_NAME[table], [primary_key, value])
 
     if user_key is not None:
-        write_table: str = """--sql
-            REPLACE INTO {} (id, user_key, name) VALUES (?, ?, ?)
-        """.format(
-            table
-        )
-        cursor.execute(write_table, [primary_key, user_key, value])
-
         # Ensure that all keys in the table are unique
-        enforce_unique_keys: str = """--sql
-            UPDATE {} SET user_key=null WHERE id != (?) AND user_key = (?)
-        """.format(
-            table
-        )
-        cursor.execute(enforce_unique_keys, [primary_key, user_key])
-    else:
-        write_table = """--sql
-            INSERT OR REPLACE INTO {} (id, name) VALUES (?, ?)
-        """.format(
-            table
-        )
-        cursor.execute(write_table, [primary_key, value])
+        cursor.execute(ENFORCE_UNIQUE_KEYS[table], [primary_key, user_key])
 
     return primary_key
 
 
 def db_populate_task_category_lists(console) -> None:
     """Populate the category & task tables in the sqlite db."""
-    for user_key, value in console.config.category_list.items():
-        db_populate_user_table(console.db_connection, "categories", value, user_key)
-
-    for user_key, value in console.config.task_list.items():
-        db_populate_user_table(console.db_connection, "tasks", value, user_key)
+    _db_populate_user_keys(
+        console.db_connection, "categories", console.config.category_list
+    )
+    _db_populate_user_keys(console.db_connection, "tasks", console.config.task_list)
 
     console.db_connection.commit()
 
 
+def _db_populate_user_keys(
+    db_connection: sqlite3.Connection, table: str, user_keys: dict
+) -> None:
+    """Populate a table with all user_key-name pairs at once.
+
+    Equivalent to calling db_populate_user_table for each pair,
+    but with the existing ids read up front and the writes batched."""
+    cursor = db_connection.cursor()
+    # descending order so the lowest id wins for any duplicated name
+    cursor.execute(GET_PRIMARY_KEYS_BY_NAME[table])
+    primary_keys: dict[str, int] = dict(cursor.fetchall())
+    rows: list[tuple[int, str, str]] = []
+    for user_key, value in user_keys.items():
+        if value not in primary_keys:
+            # new names are rare; insert them and let sqlite assign the id
+            cursor.execute(INSERT_USER_KEY[table], [user_key, value])
+            primary_keys[value] = cursor.lastrowid
+        rows.append((primary_keys[value], user_key, value))
+
+    cursor.executemany(WRITE_USER_KEY[table], rows)
+
+    # Ensure that all keys in the table are unique, with a single statement
+    # clearing each key from any row that was not just written
+    if rows:
+        enforce_unique_keys: str = ENFORCE_UNIQUE_KEYS_BATCH[table].format(
+            keys=", ".join("?" * len(rows)), ids=", ".join("?" * len(rows))
+        )
+        cursor.execute(
+            enforce_unique_keys,
+            [row[1] for row in rows] + [row[0] for row in rows],
+        )
+
+
 def db_session_metadata(
-    db_connection: sqlite3.Connection, input_type: str = "user", test_flag: bool = False
+    db_connection: sqlite3.Connection,
+    input_type: str = "user",
+    test_flag: bool = False,
+    commit: bool = True,
 ) -> int:
-    """Make entry in session table and return the session id."""
-    cursor = db_connection.cursor()
-    new_entry: str = """--sql
-        INSERT INTO sessions (titr_version, user, platform, input_type) VALUES (?, ?, ?, ?)
-    """
-    platform: str = sys.platform
-    if "linux" in platform:
-        user = os.uname().nodename
-    elif "win" in platform:
-        user = os.getlogin()
-    else:
-        user = None
+    """Make entry in session table and return the session id.
 
-    cursor.execute(new_entry, [__version__, user, platform, input_type])
+    Set commit to False to leave the entry in the open transaction,
+    to be committed along with the data written in that session."""
+    cursor = db_connection.cursor()
+    cursor.execute(
+        WRITE_SESSION, [__version__, _session_user(), sys.platform, input_type]
+    )
+    session_id: int = cursor.lastrowid
     #  if not test_flag:  # pragma: no cover
-    db_connection.commit()
+    if commit:
+        db_connection.commit()
 
-    get_session_id: str = """--sql
-        SELECT MAX(id) from sessions
-    """
-    cursor.execute(get_session_id)
-    session_id = cursor.fetchone()[0]
     #  if not test_flag:  # pragma: no cover
     #  db_connection.close()
 
     return session_id
 
 
+@functools.lru_cache(maxsize=None)
+def _session_user() -> Optional[str]:
+    """Return the user recorded with each session. Only looked up
+    once, since it can't change while titr is running."""
+    platform: str = sys.platform
+    if "linux" in platform:
+        return os.uname().nodename
+    elif "win" in platform:
+        return os.getlogin()
+    return None
+
+
 def fetch_first(cursor: sqlite3.Cursor, default: Optional[Any] = None) -> Optional[Any]:
     """Given the result of an sql query from a cursor.fetchone()
     call, return the first element if it exists.
@@ -234,70 +380,59 @@ def fetch_first(cursor: sqlite3.Cursor, default: Optional[Any] = None) -> Option
 
 def db_write_time_log(console, session_id: int) -> None:
     """Write time entries from console session to database."""
-    cursor = console.db_connection.cursor()
-    write_entry = """--sql
-        INSERT INTO time_log (date, duration, category_id, task_id, comment, session_id, start_ts, end_ts)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """
-    update_entry = """--sql
-        UPDATE time_log SET (date, duration, category_id, task_id, comment, session_id, start_ts, end_ts) =
-        (?, ?, ?, ?, ?, ?, ?, ?)
-        WHERE id = (?)
-    """
-    get_task_id = """--sql
-        SELECT id
-        FROM tasks
-        WHERE user_key = (?)
-    """
-    get_category_id = """--sql
-        SELECT id
-        FROM categories
-        WHERE user_key = (?)
-    """
+    cursor = console.cursor
+    # Resolve all user keys up front rather than querying once per entry
+    cursor.execute(GET_IDS_BY_USER_KEY["tasks"])
+    task_ids: dict[str, int] = dict(cursor.fetchall())
+    cursor.execute(GET_IDS_BY_USER_KEY["categories"])
+    category_ids: dict[str, int] = dict(cursor.fetchall())
+
+    new_entries: list[tuple] = []
+    updated_entries: list[tuple] = []
     for entry in console.time_entries:
         # TODO: Handling for no task ID found
-        cursor.execute(get_task_id, [entry.task])
-        task_id = fetch_first(cursor)
-        cursor.execute(get_category_id, [entry.category])
-        category_id = fetch_first(cursor)
-        entry_parameters = [
+        task_id = task_ids.get(entry.task)
+        # category user keys are stored as text
+        category_id = (
+            None if entry.category is None else category_ids.get(str(entry.category))
+        )
+        entry_parameters = (
             entry.date,
             entry.duration,
             category_id,
             task_id,
             entry.comment,
             session_id,
-            entry.start_ts,
-            entry.end_ts,
-        ]
+            _timestamp_str(entry.start_ts),
+            _timestamp_str(entry.end_ts),
+        )
         if entry.time_log_id is not None:
             # update existing entry
-            entry_parameters.append(entry.time_log_id)
-            cursor.execute(update_entry, entry_parameters)
+            updated_entries.append(entry_parameters + (entry.time_log_id,))
         else:
-            cursor.execute(write_entry, entry_parameters)
+            new_entries.append(entry_parameters)
+
+    # All statements run in a single transaction, committed once
+    cursor.executemany(WRITE_TIME_LOG, new_entries)
+    cursor.executemany(UPDATE_TIME_LOG, updated_entries)
     console.db_connection.commit()
 
 
+def _timestamp_str(timestamp: Optional[datetime.datetime]) -> Optional[str]:
+    """Store timestamps as ISO format text, readable with fromisoformat."""
+    return None if timestamp is None else timestamp.isoformat(" ")
+
+
 def query_deep_work(console) -> tuple[float, float]:
     """Query the database for deep work hours.
     Returns tuple of total and total over past 365 days."""
-    cursor = console.db_connection.cursor()
-
-    get_dw_total = """--sql
-        SELECT sum(duration) FROM time_log t
-        JOIN categories c on t.category_id=c.id
-        WHERE c.name = 'Deep Work'
-    """
-    cursor.execute(get_dw_total)
-    dw_total = fetch_first(cursor)
-    if dw_total is None:
-        return 0.0, 0.0
+    cursor = console.cursor
 
-    get_dw_last_365 = get_dw_total + " AND date>=(?)"
     last_year = datetime.date.today() - datetime.timedelta(days=365)
-    cursor.execute(get_dw_last_365, [last_year])
-    dw_last_365 = fetch_first(cursor)
+    cursor.execute(GET_DEEP_WORK, [last_year])
+    dw_total, dw_last_365 = cursor.fetchone()
+    if dw_total is None:
+        return 0.0, 0.0
     if dw_last_365 is None:
         dw_last_365 = 0.0
 
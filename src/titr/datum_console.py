@@ -100,8 +100,8 @@ def get_input(
         # If no pattern match, look for command match
         if exec_cmd is None:
             user_cmd, *args = user_input.split(" ")
-            if user_cmd in cmd_dict.keys():
-                exec_cmd = cmd_dict[user_cmd]
+            exec_cmd = cmd_dict.get(user_cmd)
+            if exec_cmd is not None:
                 # if command match, parse args and kwargs
                 for arg in args:
                     if "=" in arg:
@@ -126,6 +126,7 @@ def get_input(
 
 _PATTERN_LIST: dict = dict()
 _COMMAND_LIST: dict = dict()
+_ALIAS_LIST: dict = dict()
 _COMMAND_HISTORY: list[str] = []
 #####################
 # PRIVATE FUNCTIONS #
@@ -173,6 +174,8 @@ class _ConsoleCommand:
         self.hidden = hidden if self.enabled else True
 
         _COMMAND_LIST[self.name] = self
+        for alias in self.aliases:
+            _ALIAS_LIST[alias] = self
 
     def __call__(self, *args, **kwargs):
         _COMMAND_HISTORY.append(self.name)
@@ -208,12 +211,8 @@ class _ConsoleCommand:
 
 
 def _cmd_dict() -> dict:
-    cmd_dict = dict()
-    for cmd in _COMMAND_LIST.values():
-        for alias in cmd.aliases:
-            cmd_dict[alias] = cmd
-
-    return cmd_dict
+    """Map of command aliases to commands, filled as commands are registered."""
+    return _ALIAS_LIST
 
 
 #####################
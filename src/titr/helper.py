@@ -1,5 +1,12 @@
+import re
+
 from colorama import Style, Fore
 
+# plain decimal numbers, which make up almost all numeric user input
+_DECIMAL_PATTERN = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+# anything float() accepts starts with one of these (or a unicode digit)
+_FLOAT_START_CHARS = frozenset("0123456789.+-iInN")
+
 
 def disp_dict(dictionary: dict, dict_name: str):  # pragma: no cover
     """Display items in a dict"""
@@ -12,6 +19,14 @@ def is_float(item: str) -> bool:
     """Determine if a string represents a float."""
     if not isinstance(item, (str, int, float)):
         raise TypeError
+    if not isinstance(item, str):
+        return True
+    # Avoid raising exceptions for the common cases
+    if _DECIMAL_PATTERN.fullmatch(item):
+        return True
+    first_char: str = item.lstrip()[:1]
+    if not first_char or not (first_char in _FLOAT_START_CHARS or first_char.isdigit()):
+        return False
     try:
         float(item)
         return True
@@ -31,14 +31,9 @@ def get_outlook_items(search_date: datetime.date, calendar_name: str, outlook_ac
     cal_items.Sort("Start", False)
     cal_items.IncludeRecurrences = True
     search_end: datetime.date = search_date + datetime.timedelta(days=1)
-    search_str: str = "".join(
-        [
-            "[Start] >= '",
-            search_date.strftime(MAPI_TIME_FORMAT),
-            "' AND [End] <= '",
-            search_end.strftime(MAPI_TIME_FORMAT),
-            "'",
-        ]
+    search_str: str = (
+        f"[Start] >= '{search_date.strftime(MAPI_TIME_FORMAT)}'"
+        f" AND [End] <= '{search_end.strftime(MAPI_TIME_FORMAT)}'"
     )
 
     cal_filtered = cal_items.Restrict(search_str)
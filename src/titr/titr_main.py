@@ -8,19 +8,23 @@ https://github.com/blairfrandeen/titr
 """
 
 import argparse
-import csv
 import datetime
+import functools
+import itertools
 import math
 import sqlite3
 import sys
 import textwrap
 
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Optional, TYPE_CHECKING
 
 from colorama import Fore, Style
-import pandas as pd
-import click
+
+# pandas and click are slow to import, so they are only
+# imported by the commands that use them
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
 
 OUTLOOK_ENABLED = "win" in sys.platform
 
@@ -28,12 +32,11 @@ OUTLOOK_ENABLED = "win" in sys.platform
 sys.path.append("src")
 
 import titr
-
-if OUTLOOK_ENABLED:
-    import titr.outlook
 import titr.datum_console as dc
 from titr.config import Config, load_config
 from titr.database import (
+    GET_PRIMARY_KEYS_BY_NAME,
+    TIME_LOG_INDEXES,
     db_populate_task_category_lists,
     db_session_metadata,
     db_populate_user_table,
@@ -48,6 +51,56 @@ f"""Welcome to titr. Version {titr.__version__}. DB v{titr.__db_user_version__}.
 https://github.com/blairfrandeen/titr""")
 # fmt: on
 
+# number of imported rows above which the time log indexes are rebuilt,
+# if the import is also at least as large as the existing time log
+IMPORT_INDEX_REBUILD_ROWS: int = 1000
+# number of imported rows held in memory before they are written
+IMPORT_CHUNK_ROWS: int = 10000
+
+# formatting for time entries
+_TIME_ENTRY_FORMAT: str = (
+    "{{date:{}}}{{duration:<{}.2f}}{{task:{}}}{{cat:{}}}{{comment:{}}}".format(
+        *titr.TIME_ENTRY_COL_WIDTHS
+    )
+)
+_TIME_ENTRY_WIDTH: int = sum(titr.TIME_ENTRY_COL_WIDTHS)
+_COMMENT_INDENT: str = sum(titr.TIME_ENTRY_COL_WIDTHS[0:4]) * " "
+_TIME_ENTRY_HEADER: str = "".join(
+    f"{heading:{width}}"
+    for heading, width in zip(
+        ["DATE", "HOURS", "TASK", "CATEGORY", "COMMENT"], titr.TIME_ENTRY_COL_WIDTHS
+    )
+)
+_TIME_ENTRY_TOTAL_FORMAT: str = "{{:{}}}{{:<{}.2f}}".format(
+    *titr.TIME_ENTRY_COL_WIDTHS[0:2]
+)
+
+# formatting for the weekly timecard
+_TIMECARD_COL_WIDTHS: list[int] = [30, 8, 15, 12]
+_TIMECARD_HEADER: str = "".join(
+    f"{heading:{width}}"
+    for heading, width in zip(
+        ["TASK", "HOURS", "ADJ. HOURS", "PERCENTAGE"], _TIMECARD_COL_WIDTHS
+    )
+)
+_TIMECARD_ROW_FORMAT: str = "{{:{}}}{{:<{}.2f}}{{:<{}.2f}}{{:<{}.2%}}".format(
+    *_TIMECARD_COL_WIDTHS
+)
+_TIMECARD_TOTAL_FORMAT: str = "{{:{}}}{{:<{}.2f}}".format(*_TIMECARD_COL_WIDTHS[0:2])
+
+# formatting for today's log
+_TODAY_LOG_COLUMNS: list[str] = ["Duration", "Category", "Task", "Comment"]
+_TODAY_LOG_COL_WIDTHS: list[int] = [10, 22, 22]
+_TODAY_LOG_HEADER: str = "".join(
+    f"{heading:{width}}"
+    for heading, width in zip(_TODAY_LOG_COLUMNS, _TODAY_LOG_COL_WIDTHS + [0])
+)
+_TODAY_LOG_FORMAT: str = "{{:<{}.2f}}{{:{}}}{{:{}}}{{}}".format(*_TODAY_LOG_COL_WIDTHS)
+
+# styles for summary rows
+_STYLE_TOTAL: str = Style.BRIGHT + Fore.GREEN
+_STYLE_RESET: str = Style.NORMAL + Fore.RESET
+
 
 def main() -> None:
     args: argparse.Namespace = parse_args()
@@ -91,12 +144,29 @@ class TimeEntry:
     end_ts: Optional[datetime.datetime] = None
     time_log_id: Optional[int] = None
     comment: str = field(default_factory=str)
-    cat_str: str = field(default_factory=str)
-    tsk_str: str = field(default_factory=str)
+    config: Optional[Config] = field(default=None, compare=False, repr=False)
+    # last rendered string, along with the values it was rendered from
+    _rendered: Optional[tuple[tuple, str]] = field(
+        default=None, init=False, compare=False, repr=False
+    )
 
     def __repr__(self):
         return f"{self.date.isoformat()},{self.duration},{self.task},{self.category}"
 
+    @property
+    def cat_str(self) -> str:
+        """Name of the entry category, looked up only when displayed."""
+        if self.config is None or not self.category:
+            return ""
+        return self.config.category_list[self.category]
+
+    @property
+    def tsk_str(self) -> str:
+        """Name of the entry task, looked up only when displayed."""
+        if self.config is None or not self.task:
+            return ""
+        return self.config.task_list[self.task.lower()]
+
     @property
     def tsv_str(self):  # pragma: no cover
         tsv_str: str = "\t".join(
@@ -110,42 +180,52 @@ class TimeEntry:
         )
         return tsv_str
 
-    def __str__(self):  # pragma: no cover
+    def __str__(self):
+        # entries are previewed often but rarely change, so only
+        # render again if one of the displayed values has changed
+        render_key: tuple = (
+            self.date,
+            self.duration,
+            self.tsk_str,
+            self.cat_str,
+            self.comment,
+        )
+        if self._rendered is not None and self._rendered[0] == render_key:
+            return self._rendered[1]
+        self_str: str = self._render()
+        self._rendered = (render_key, self_str)
+        return self_str
+
+    def _render(self) -> str:
         w0, w1, w2, w3, w4 = titr.TIME_ENTRY_COL_WIDTHS
-        comment_str_first: list[str] = (
-            textwrap.wrap(
-                self.comment,
-                width=w4,
-                initial_indent="",
-                subsequent_indent=sum(titr.TIME_ENTRY_COL_WIDTHS[0:4]) * " ",
+        # Most comments already fit in their column, and wrapping
+        # them would return them unchanged
+        comment: str = self.comment or ""
+        comment_str_first: str = comment
+        comment_str_others: list[str] = []
+        if len(comment) > w4 or not comment.isprintable() or comment != comment.strip():
+            comment_str_first = (
+                textwrap.wrap(
+                    comment,
+                    width=w4,
+                    initial_indent="",
+                    subsequent_indent=_COMMENT_INDENT,
+                )
+                or [""]
             )[0]
-            if self.comment
-            else ""
-        )
-        self_str = (
-            "{date:{w0}}{duration:<{w1}.2f}{task:{w2}}{cat:{w3}}{comment:{w4}}".format(
-                date=self.date.isoformat(),
-                duration=self.duration,
-                task=textwrap.shorten(self.tsk_str, w2 - 1, break_on_hyphens=False),
-                cat=textwrap.shorten(self.cat_str, w3 - 1, break_on_hyphens=False),
-                comment=comment_str_first,
-                w0=w0,
-                w1=w1,
-                w2=w2,
-                w3=w3,
-                w4=w4,
-            )
-        )
-        comment_str_others: list[str] = (
-            textwrap.wrap(
-                self.comment[len(comment_str_first) :].strip(),
-                width=sum(titr.TIME_ENTRY_COL_WIDTHS),
-                initial_indent=sum(titr.TIME_ENTRY_COL_WIDTHS[0:4]) * " ",
-                subsequent_indent=sum(titr.TIME_ENTRY_COL_WIDTHS[0:4]) * " ",
+            comment_str_others = textwrap.wrap(
+                comment[len(comment_str_first) :].strip(),
+                width=_TIME_ENTRY_WIDTH,
+                initial_indent=_COMMENT_INDENT,
+                subsequent_indent=_COMMENT_INDENT,
                 max_lines=2,
             )
-            if self.comment
-            else ""
+        self_str = _TIME_ENTRY_FORMAT.format(
+            date=self.date.isoformat(),
+            duration=self.duration,
+            task=textwrap.shorten(self.tsk_str, w2 - 1, break_on_hyphens=False),
+            cat=textwrap.shorten(self.cat_str, w3 - 1, break_on_hyphens=False),
+            comment=comment_str_first,
         )
         for line in comment_str_others:
             self_str += "\n" + line
@@ -155,7 +235,7 @@ class TimeEntry:
 @dataclass
 class ConsoleSession:
     database_file: str = titr.TITR_DB
-    date: datetime.date = datetime.date.today()
+    date: datetime.date = field(default_factory=datetime.date.today)
     outlook_item: Optional[tuple] = field(default_factory=tuple)
     time_entries: list = field(default_factory=list)
 
@@ -166,6 +246,8 @@ class ConsoleSession:
         self.db_connection: sqlite3.Connection = titr.database.db_initialize(
             database=self.database_file
         )
+        # shared by console commands, rather than one cursor per command
+        self.cursor: sqlite3.Cursor = self.db_connection.cursor()
         db_populate_task_category_lists(self)
 
     def __enter__(self):
@@ -174,11 +256,12 @@ class ConsoleSession:
     def __exit__(self, *args) -> None:
         """When opened with a context manager, this will
         safely close the connection in case of crash or system exist."""
+        self.cursor.close()
         self.db_connection.close()
 
     def add_entry(self, entry: TimeEntry, set_defaults: bool = True) -> TimeEntry:
         """Add a TimeEntry to the console. Set the date, defaults, and the
-        string representations of category and task."""
+        config used to look up names of the category and task."""
         entry.date = self.date if not entry.date else entry.date
         if set_defaults:
             # Set console-config based default category & task,
@@ -190,17 +273,24 @@ class ConsoleSession:
             )
             entry.task = self.config.default_task if entry.task is None else entry.task
 
-        entry.cat_str = (
-            self.config.category_list[entry.category] if entry.category else ""
-        )
-        entry.tsk_str = self.config.task_list[entry.task.lower()] if entry.task else ""
+        entry.config = self.config
 
         self.time_entries.append(entry)
         return entry
 
+    @property
+    def week_bounds(self) -> tuple[datetime.date, datetime.date]:
+        """First and last day of the week containing the session date.
+        Weeks start on Monday."""
+        week_start: datetime.date = self.date - datetime.timedelta(
+            days=self.date.weekday()
+        )
+        return week_start, week_start + datetime.timedelta(days=6)
+
     @property
     def total_duration(self) -> float:
-        return round(sum([entry.duration for entry in self.time_entries]), 2)
+        # rounded for display by the preview format
+        return sum(entry.duration for entry in self.time_entries)
 
 
 #####################
@@ -209,11 +299,12 @@ class ConsoleSession:
 
 
 def time_entry_pattern(user_input: str) -> bool:
-    return is_float(user_input.split(" ")[0])
+    # only the first word matters; don't split the rest of the input
+    return is_float(user_input.partition(" ")[0])
 
 
 def outlook_entry_pattern(user_input: str) -> bool:
-    return time_entry_pattern(user_input) or user_input == ""
+    return user_input == "" or time_entry_pattern(user_input)
 
 
 @dc.ConsoleCommand(name="add")
@@ -274,12 +365,9 @@ def copy_output(console) -> None:
     Output is copied in TSV (tab-separated values)"""
     import pyperclip
 
-    output_str: str = ""
     if len(console.time_entries) > 0:
-        for entry in console.time_entries:
-            output_str += entry.tsv_str + "\n"
-
-        pyperclip.copy(output_str.strip())
+        output_str: str = "\n".join(entry.tsv_str for entry in console.time_entries)
+        pyperclip.copy(output_str)
         print("TSV Output copied to clipboard.")
     else:
         print("No time has been entered.")
@@ -288,6 +376,8 @@ def copy_output(console) -> None:
 @dc.ConsoleCommand(name="config")
 def edit_config(console) -> None:
     """Edit the titr.cfg configuration file using vim."""
+    import click
+
     try:
         click.edit(filename=titr.CONFIG_FILE, editor="vim")
     # try without specifying vim
@@ -316,25 +406,14 @@ def list_categories_and_tasks(console):
 @dc.ConsoleCommand(name="preview", aliases=["p"])
 def preview_output(console: ConsoleSession) -> None:
     """Preview time entries that have been entered so far."""
-    print(Style.BRIGHT, end="")
-    for index, heading in enumerate(["DATE", "HOURS", "TASK", "CATEGORY", "COMMENT"]):
-        print(
-            "{heading:{wd}}".format(
-                heading=heading, wd=titr.TIME_ENTRY_COL_WIDTHS[index]
-            ),
-            end="",
-        )
-    print(Style.NORMAL)
-    for entry in console.time_entries:
-        print(entry)
-    print(Style.BRIGHT + Fore.GREEN, end="")
-    print("{s:{wd}}".format(s="TOTAL", wd=titr.TIME_ENTRY_COL_WIDTHS[0]), end="")
+    print(Style.BRIGHT + _TIME_ENTRY_HEADER + Style.NORMAL)
+    # write all entries at once rather than one print call per entry
+    if console.time_entries:
+        print("\n".join(str(entry) for entry in console.time_entries))
     print(
-        "{d:<{wd}.2f}".format(
-            d=console.total_duration, wd=titr.TIME_ENTRY_COL_WIDTHS[1]
-        )
+        _STYLE_TOTAL + _TIME_ENTRY_TOTAL_FORMAT.format("TOTAL", console.total_duration)
     )
-    print(Style.NORMAL + Fore.RESET, end="")
+    print(_STYLE_RESET, end="")
 
 
 @dc.ConsoleCommand(name="scale", aliases=["s"])
@@ -342,10 +421,11 @@ def scale_time_entries(console: ConsoleSession, target_total: str) -> None:
     """Scale time entries by weighted average to sum to a target total duration."""
     if not is_float(target_total):
         raise dc.InputError(f"Cannot convert {target_total} to float.")
-    if float(target_total) == 0:
+    target_hours: float = float(target_total)
+    if target_hours == 0:
         raise dc.InputError("Cannot scale to zero.")
-    unscaled_total: float = sum([entry.duration for entry in console.time_entries])
-    scale_amount: float = float(target_total) - unscaled_total
+    unscaled_total: float = sum(entry.duration for entry in console.time_entries)
+    scale_amount: float = target_hours - unscaled_total
     if scale_amount == 0:
         return None
     if unscaled_total == 0:
@@ -353,6 +433,7 @@ def scale_time_entries(console: ConsoleSession, target_total: str) -> None:
         return None
 
     print(f"Scaling from {unscaled_total} hours to {target_total} hours.")
+    # Not simplified to a single scale factor, which rounds differently
     for entry in console.time_entries:
         entry.duration = entry.duration + scale_amount * entry.duration / unscaled_total
 
@@ -373,34 +454,34 @@ def set_date(console, datestr: str = None) -> None:
         console.date = datetime.date.today()
         print(f"Date set to {console.date.isoformat()}")
         return None
-    new_date: Optional[datetime.date] = None
-    try:
+    new_date: datetime.date
+    # check for an offset like '-1' without raising on ISO dates
+    offset: str = datestr[1:] if datestr[0] in "+-" else datestr
+    if offset.isdecimal():
         date_delta: int = int(datestr)
-    except ValueError:
-        pass
-    else:
         if date_delta > 0:
             raise dc.InputError("Date cannot be in the future.")
         new_date = datetime.date.today() + datetime.timedelta(days=date_delta)
-
-    try:
-        new_date = datetime.date.fromisoformat(datestr) if not new_date else new_date
-    except ValueError as err:
-        raise dc.InputError(
-            f"Error: Invalid date: {datestr}. See 'help date' for more info."
-        )
     else:
-        if new_date > datetime.date.today():
-            raise dc.InputError("Date cannot be in the future")
+        try:
+            new_date = datetime.date.fromisoformat(datestr)
+        except ValueError as err:
+            raise dc.InputError(
+                f"Error: Invalid date: {datestr}. See 'help date' for more info."
+            )
 
-        console.date = new_date
-        print(f"Date set to {console.date.isoformat()}")
+    if new_date > datetime.date.today():
+        raise dc.InputError("Date cannot be in the future")
+
+    console.date = new_date
+    print(f"Date set to {console.date.isoformat()}")
 
 
 @dc.ConsoleCommand(name="undo", aliases=["u", "z"])
 def undo_last(console) -> None:
     """Undo last entry."""
-    console.time_entries = console.time_entries[:-1]
+    if console.time_entries:
+        console.time_entries.pop()
 
 
 @dc.ConsoleCommand(name="write", aliases=["c", "commit"])
@@ -421,7 +502,10 @@ def write_db(console: ConsoleSession, input_type: str = "user") -> None:
     # modifiable through the program
 
     # Write metadata about the current session, and get the session id
-    session_id: int = db_session_metadata(console.db_connection, input_type=input_type)
+    # The session and its entries are committed together in db_write_time_log
+    session_id: int = db_session_metadata(
+        console.db_connection, input_type=input_type, commit=False
+    )
 
     # Write the time entries to the database
     db_write_time_log(console, session_id)
@@ -436,7 +520,7 @@ def work_modes(
     console: ConsoleSession,
     threshold: float = 0.005,
     test_flag=False,
-) -> Optional[pd.DataFrame]:
+) -> Optional["pd.DataFrame"]:
     """
     Show work mode summary for this week.
 
@@ -444,27 +528,30 @@ def work_modes(
     to any day within the week of interest using the date command.
 
     Weeks start on Monday."""
+    import pandas as pd
+
     conn = console.db_connection
     category_query = """--sql
-        SELECT l.date, l.duration, c.name FROM time_log l
+        SELECT l.duration, c.name FROM time_log l
         JOIN categories c ON c.id = l.category_id
-        ORDER BY date
+        WHERE l.date >= (?) AND l.date <= (?)
     """
-    date_start: pd.datetime64 = pd.to_datetime(
-        console.date - datetime.timedelta(days=console.date.weekday())
-    )
-    date_end: pd.datetime64 = pd.to_datetime(date_start + datetime.timedelta(days=6))
-    category_cols = "date duration category".split()
+    date_start, date_end = console.week_bounds
+    category_cols = "duration category".split()
 
-    data = pd.read_sql(category_query, conn, parse_dates=["date"])
+    # only load entries for the week of interest; dates are stored
+    # as ISO format text, so they can be compared as strings
+    data = pd.read_sql(
+        category_query,
+        conn,
+        params=[date_start.isoformat(), date_end.isoformat()],
+    )
     if data.empty:
         print(f"No Data Available. Enter some data, or try different dates")
         return None
 
-    # name the columns, trim to the proper date range
+    # name the columns
     data.columns = category_cols
-    data[(data["date"] >= date_start) & (data["date"] < date_end)]
-    data = data.set_index("date").sort_values("date").loc[date_start:date_end]
 
     summary = data.groupby("category").sum()
 
@@ -475,12 +562,11 @@ def work_modes(
     summary["percent"] = summary["duration"] / total_hours
 
     # Group modes under a certain threshold to an "other" category
-    other_duration = summary[summary["percent"] < threshold]["duration"].sum()
-    summary.loc["Other", :] = {
-        "duration": summary[summary["percent"] < threshold].loc[:, "duration"].sum(),
-        "percent": summary[summary["percent"] < threshold].loc[:, "percent"].sum(),
-    }
-    summary = summary[summary["percent"] >= threshold]
+    below = summary["percent"] < threshold
+    other = summary.loc[below].sum()
+    summary = summary.loc[~below]
+    if other["percent"] >= threshold:
+        summary.loc["Other", :] = other
 
     if not test_flag:  # pragma: no cover
         # Make everything pretty
@@ -500,75 +586,64 @@ def show_weekly_timecard(console: ConsoleSession) -> float:
     to any day within the week of interest using the date command.
 
     Weeks start on Monday."""
-    week_start: datetime.date = console.date - datetime.timedelta(
-        days=console.date.weekday()
-    )
-    week_end: datetime.date = week_start + datetime.timedelta(days=6)
-    cursor = console.db_connection.cursor()
+    week_start, week_end = console.week_bounds
+    cursor = console.cursor
 
+    # Totals, percentages, and hours adjusted to distribute
+    # incidental time are all computed by the database
+    incidental_tasks: list[str] = console.config.incidental_tasks
     get_totals_by_task: str = """--sql
-        SELECT t.name, sum(l.duration), t.user_key FROM time_log l
-        JOIN tasks t ON t.id = l.task_id
-        WHERE l.date >= (?) AND l.date <= (?)
-        GROUP BY l.task_id;
-    """
+        WITH task_totals AS (
+            SELECT l.task_id, t.name, sum(l.duration) AS hours,
+                t.user_key IN ({}) AS incidental
+            FROM time_log l
+            JOIN tasks t ON t.id = l.task_id
+            WHERE l.date >= (?) AND l.date <= (?)
+            GROUP BY l.task_id
+        ), week_totals AS (
+            SELECT task_id, name, hours, incidental,
+                sum(hours) OVER () AS week_total,
+                sum(CASE WHEN incidental THEN hours ELSE 0 END) OVER ()
+                    AS incidental_total
+            FROM task_totals
+        ), task_percentages AS (
+            SELECT task_id, name, hours, incidental, week_total, incidental_total,
+                hours / (week_total - incidental_total) AS percentage
+            FROM week_totals
+        )
+        SELECT name, hours,
+            CASE WHEN incidental THEN 0 ELSE hours + incidental_total * percentage END,
+            CASE WHEN incidental THEN 0 ELSE percentage END,
+            week_total
+        FROM task_percentages
+        ORDER BY task_id;
+    """.format(
+        ", ".join("?" * len(incidental_tasks))
+    )
     cursor.execute(
         get_totals_by_task,
-        [week_start, week_end],
+        [*incidental_tasks, week_start, week_end],
     )
-    totals_by_task: list[tuple[str, float, str]] = cursor.fetchall()
-    week_total_hours = _sum_grouped_tasks(totals_by_task)
+    totals_by_task: list[tuple[str, float, float, float, float]] = cursor.fetchall()
+    week_total_hours = totals_by_task[0][4] if totals_by_task else 0
 
-    col_widths = [30, 8, 15, 12]
     if week_total_hours > 0:
-        total_incidental: float = _sum_grouped_tasks(
-            filter(lambda x: x[2] in console.config.incidental_tasks, totals_by_task)
-        )
-        print(  # HEADER ROW
-            Style.BRIGHT
-            + "{:{}}{:{}}{:{}}{:{}}".format(
-                "TASK",
-                col_widths[0],
-                "HOURS",
-                col_widths[1],
-                "ADJ. HOURS",
-                col_widths[2],
-                "PERCENTAGE",
-                col_widths[3],
-            )
-            + Style.NORMAL
-        )
+        print(Style.BRIGHT + _TIMECARD_HEADER + Style.NORMAL)  # HEADER ROW
         # Print individual rows by task
-        for task in totals_by_task:
-            if task[2] not in console.config.incidental_tasks:
-                # TODO: Error handling in case of all incidental time
-                try:
-                    task_percentage: float = task[1] / (
-                        week_total_hours - total_incidental
-                    )
-                except ZeroDivisionError:
-                    task_percentage = float("nan")
-                task_adj_hrs: float = task[1] + total_incidental * task_percentage
-            else:
-                task_percentage, task_adj_hrs = 0, 0
+        for task_name, task_hrs, task_adj_hrs, task_percentage, _ in totals_by_task:
+            # TODO: Error handling in case of all incidental time
+            # (division by zero is returned as NULL)
+            if task_percentage is None:
+                task_percentage = task_adj_hrs = float("nan")
             print(
-                "{:{}}{:<{}.2f}{:<{}.2f}{:<{}.2%}".format(
-                    task[0],
-                    col_widths[0],
-                    task[1],
-                    col_widths[1],
-                    task_adj_hrs,
-                    col_widths[2],
-                    task_percentage,
-                    col_widths[3],
+                _TIMECARD_ROW_FORMAT.format(
+                    task_name, task_hrs, task_adj_hrs, task_percentage
                 )
             )
         print(  # TOTAL ROW
             Style.BRIGHT
             + Fore.GREEN
-            + "{:{}}{:<{}.2f}".format(
-                "", col_widths[0], week_total_hours, col_widths[1]
-            )
+            + _TIMECARD_TOTAL_FORMAT.format("", week_total_hours)
             + Style.RESET_ALL
         )
     else:
@@ -580,34 +655,46 @@ def show_weekly_timecard(console: ConsoleSession) -> float:
 @dc.ConsoleCommand(name="today")
 def show_today_log(
     console: ConsoleSession, test_flag: bool = False
-) -> Optional[pd.DataFrame]:
+) -> Optional["pd.DataFrame"]:
     """
     Show tasks completed today.
     """
-    conn = console.db_connection
     log_query = """--sql
-        SELECT l.date, l.duration, c.name, t.name, l.comment FROM time_log l
+        SELECT l.duration, c.name, t.name, l.comment FROM time_log l
         JOIN categories c ON c.id = l.category_id
         JOIN tasks t on t.id = l.task_id
+        WHERE l.date = (?)
         ORDER BY l.id
     """
-    data = pd.read_sql(
-        log_query,
-        conn,
-        parse_dates=["date"],
-    )
-    data.columns = "Date Duration Category Task Comment".split()
-    data = data[data["Date"] == pd.to_datetime(console.date)]
-    total_duration = data["Duration"].sum()
+    cursor = console.cursor
+    cursor.execute(log_query, [console.date.isoformat()])
+    log_entries: list[tuple[float, str, str, str]] = cursor.fetchall()
+    total_duration: float = sum(entry[0] for entry in log_entries)
     if total_duration == 0:
         print(f"No entries found for {console.date.isoformat()}.")
         return None
-    if not test_flag:  # pragma: no cover
-        data["Duration"] = data["Duration"].map("{:.2f}".format)
     print(f"Tasks for {console.date.isoformat()}:")
-    print(data[["Duration", "Category", "Task", "Comment"]].to_string(index=False))
+    print(_TODAY_LOG_HEADER)
+    print("\n".join(_format_today_log_entry(*entry) for entry in log_entries))
     print(f"Total Duration: {round(total_duration,2)}")
-    return data
+    if test_flag:
+        import pandas as pd
+
+        return pd.DataFrame(log_entries, columns=_TODAY_LOG_COLUMNS)
+    return None
+
+
+def _format_today_log_entry(
+    duration: float, category: str, task: str, comment: str
+) -> str:
+    """Format a row of today's log, shortening names that don't fit their column."""
+    w0, w1, w2 = _TODAY_LOG_COL_WIDTHS
+    return _TODAY_LOG_FORMAT.format(
+        duration,
+        textwrap.shorten(category, w1 - 1, break_on_hyphens=False),
+        textwrap.shorten(task, w2 - 1, break_on_hyphens=False),
+        comment,
+    )
 
 
 @dc.ConsoleCommand(name="deepwork", aliases=["dw"])
@@ -653,13 +740,28 @@ def import_from_outlook(console: ConsoleSession) -> None:
 
     Requires that outlook be running with the account specified
     in your ~/.titr/titr.cfg file active. Windows only."""
+    # win32com is slow to import, so only load it when outlook is used
+    import titr.outlook
+
     outlook_items = titr.outlook.get_outlook_items(
         console.date, console.config.calendar_name, console.config.outlook_account
     )
     if outlook_items is not None:
         # Note: using len(outlook_items) or outlook_items.Count
-        # will return an undefined value.
-        num_items = sum(1 for _ in outlook_items)
+        # will return an undefined value. Read all items in a
+        # single pass instead, and iterate over the list below.
+        # Each property access is a COM call, so read them only once.
+        appointments: list[tuple] = [
+            (
+                item.Subject,
+                item.Categories,
+                item.Duration,
+                item.BusyStatus,
+                item.AllDayEvent,
+            )
+            for item in outlook_items
+        ]
+        num_items = len(appointments)
         if num_items == 0:
             raise dc.InputError(f"No outlook items found for {console.date}")
 
@@ -672,26 +774,21 @@ def import_from_outlook(console: ConsoleSession) -> None:
 
         print(f"Found total of {num_items} events for {console.date}:")
         # console._set_outlook_mode()
-        for item in outlook_items:
+        for subject, categories, minutes, busy_status, all_day in appointments:
             if (
-                (
-                    item.AllDayEvent is True
-                    and console.config.skip_all_day_events is True
-                )
-                or item.Subject in console.config.skip_event_names
-                or item.BusyStatus in console.config.skip_event_status
+                (all_day is True and console.config.skip_all_day_events is True)
+                or busy_status in console.config.skip_event_status
+                or subject in console.config.skip_event_names
             ):
                 continue
-            comment: str = item.Subject
-            duration: float = item.Duration / 60  # convert minutes to hours
+            comment: str = subject
+            duration: float = minutes / 60  # convert minutes to hours
 
             # TODO: Accept multiple categories
-            appt_category = item.Categories.split(",")[0].strip()
-            category = console.config.default_category
-            for key, cat in console.config.category_list.items():
-                if cat == appt_category:
-                    category = key
-                    break
+            appt_category = categories.split(",")[0].strip()
+            category = console.config.category_by_name.get(
+                appt_category, console.config.default_category
+            )
 
             # TODO: Improve formatting
             cat_str = console.config.category_list[category]
@@ -728,83 +825,145 @@ def import_from_csv(
     Date: date | duration: float | task: str | category: str | comment: str
     Returns number of rows added.
     """
+    # csv is only needed by the import and export commands
+    import csv
 
-    cursor = console.db_connection.cursor()
+    cursor = console.cursor
+    # The whole import is one transaction, only committed once confirmed
+    if not console.db_connection.in_transaction:
+        cursor.execute("BEGIN")
     session_id: int = db_session_metadata(
-        console.db_connection, input_type="import_from_csv"
+        console.db_connection, input_type="import_from_csv", commit=False
     )
     write_entry: str = """--sql
         INSERT INTO time_log (date, duration, category_id, task_id, comment, session_id)
         VALUES (?, ?, ?, ?, ?, ?)
     """
+    cursor.execute("SELECT count(*) FROM time_log")
+    rebuild_rows: int = max(IMPORT_INDEX_REBUILD_ROWS, fetch_first(cursor, 0))
+    index_dropped: bool = False
+
+    def _write_entries(entries: list[tuple], num_entries: int) -> None:
+        """Write a chunk of entries to the time log."""
+        nonlocal index_dropped
+        # Rebuilding the indexes re-indexes the whole time log, so it is only
+        # faster than updating them for every row when the import is large
+        # compared to the existing log
+        if not index_dropped and num_entries >= rebuild_rows:
+            for index_name in TIME_LOG_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+            index_dropped = True
+        cursor.executemany(write_entry, entries)
+        entries.clear()
 
     try:
         with open(csv_file_path, "r") as csv_handle:
             csv_reader = csv.reader(csv_handle)
-            row_num: int = 0
             num_entries: int = 0
             total_hours: float = 0.0
+            new_entries: list[tuple] = []
+            warnings: list[str] = []
+            # ids of existing tasks & categories by name, read up front
+            cursor.execute(GET_PRIMARY_KEYS_BY_NAME["tasks"])
+            task_ids: dict[str, int] = dict(cursor.fetchall())
+            cursor.execute(GET_PRIMARY_KEYS_BY_NAME["categories"])
+            category_ids: dict[str, int] = dict(cursor.fetchall())
+            entry_dates: dict[str, datetime.date] = dict()
             # loop row-by-row, starting at the first row if header_row=None
             # else start at header_row + 1
-            for row in csv_reader:
-                row_num += 1
-                if header_row is not None and row_num <= int(header_row):
-                    continue
-
-                # convert the date
-                try:
-                    month, day, year = row[0].split("/")
-                    entry_date: datetime.date = datetime.date(
-                        int(year), int(month), int(day)
-                    )
-                except ValueError:
-                    print(
-                        f"Warning: {row_num=} has invalid date {row[0]}. Skipping entry."
+            last_header_row: int = 0 if header_row is None else int(header_row)
+            for row_num, row in enumerate(
+                itertools.islice(csv_reader, last_header_row, None),
+                start=last_header_row + 1,
+            ):
+                if len(row) < 5:
+                    warnings.append(
+                        f"Warning: {row_num=} has missing columns. Skipping entry."
                     )
                     continue
+                (
+                    date_str,
+                    duration_str,
+                    task_name,
+                    category_name,
+                    entry_comment,
+                ) = row[0:5]
+
+                # convert the date, only parsing dates not seen before
+                entry_date: Optional[datetime.date] = entry_dates.get(date_str)
+                if entry_date is None:
+                    try:
+                        month, day, year = date_str.split("/")
+                        entry_date = datetime.date(int(year), int(month), int(day))
+                    except ValueError:
+                        warnings.append(
+                            f"Warning: {row_num=} has invalid date {date_str}. Skipping entry."
+                        )
+                        continue
+                    entry_dates[date_str] = entry_date
 
                 # convert the entry duration
                 try:
-                    entry_duration = float(row[1])
+                    entry_duration = float(duration_str)
                 except ValueError:
-                    print(
-                        f"Warning: {row_num=} has invalid duration {row[1]}. Skipping entry."
+                    warnings.append(
+                        f"Warning: {row_num=} has invalid duration {duration_str}. Skipping entry."
                     )
                     continue
 
-                # Get task & category ids
-                task_id = db_populate_user_table(console.db_connection, "tasks", row[2])
-                category_id = db_populate_user_table(
-                    console.db_connection,
-                    "categories",
-                    row[3],
-                    user_key=None,
-                )
-
-                entry_comment = row[4]
+                # Get task & category ids, only adding new names
+                if task_name not in task_ids:
+                    task_ids[task_name] = db_populate_user_table(
+                        console.db_connection, "tasks", task_name
+                    )
+                if category_name not in category_ids:
+                    category_ids[category_name] = db_populate_user_table(
+                        console.db_connection,
+                        "categories",
+                        category_name,
+                        user_key=None,
+                    )
 
-                cursor.execute(
-                    write_entry,
-                    [
+                new_entries.append(
+                    (
                         entry_date,
                         entry_duration,
-                        category_id,
-                        task_id,
+                        category_ids[category_name],
+                        task_ids[task_name],
                         entry_comment,
                         session_id,
-                    ],
+                    )
                 )
                 num_entries = num_entries + 1
                 total_hours = total_hours + entry_duration
+                if len(new_entries) >= IMPORT_CHUNK_ROWS:
+                    _write_entries(new_entries, num_entries)
+        # report skipped rows together once the file has been read
+        if warnings:
+            print("\n".join(warnings))
+
+        _write_entries(new_entries, num_entries)
+        if index_dropped:
+            for create_index in TIME_LOG_INDEXES.values():
+                cursor.execute(create_index)
+            cursor.execute("ANALYZE time_log")
+
+        print(f"Total of {num_entries} entries found totalling {total_hours} hours.")
+        continue_prompt = input("Enter 'y' to continue: ")
     except FileNotFoundError as err:
+        console.db_connection.rollback()
         print(err)
         return 0
+    except BaseException:
+        # never leave the import transaction open
+        console.db_connection.rollback()
+        raise
 
-    print(f"Total of {num_entries} entries found totalling {total_hours} hours.")
-    continue_prompt = input("Enter 'y' to continue: ")
     if continue_prompt == "y":
         console.db_connection.commit()
         print("Entries committed to database.")
+    else:
+        console.db_connection.rollback()
 
     return num_entries
 
@@ -823,25 +982,32 @@ def export_to_csv(
     Exports CSV file with header row.
     Columns Date, Duration, Task, Category, and Comment
     """
+    import csv
+
     csv_export_q = """--sql
         SELECT l.date, l.duration, t.name, c.name, l.comment
         FROM time_log l
         JOIN categories c ON c.id=l.category_id
         JOIN tasks t ON t.id=l.task_id
     """
-    cursor = console.db_connection.cursor()
+    cursor = console.cursor
     cursor.execute(csv_export_q)
-    data = cursor.fetchall()
-    if len(data) < 1:
+    first_row: Optional[tuple] = cursor.fetchone()
+    if first_row is None:
         print("No data to export.")
         return 0
+    num_rows: int = 1
     with open(csv_file_path, "w", newline="") as csv_handle:
         writer = csv.writer(csv_handle)
         writer.writerow(["Date", "Duration", "Task", "Category", "Comment"])
-        writer.writerows(data)
+        writer.writerow(first_row)
+        # stream the remaining rows rather than loading them all into memory
+        for row in cursor:
+            writer.writerow(row)
+            num_rows += 1
 
-    print(f"Exported {len(data)} rows to {csv_file_path}.")
-    return len(data)
+    print(f"Exported {num_rows} rows to {csv_file_path}.")
+    return num_rows
 
 
 #####################
@@ -857,9 +1023,12 @@ def _parse_time_entry(console: ConsoleSession, raw_input: str) -> Optional[TimeE
     Else returns a dict to be passed to a new TimeEntry"""
     if raw_input == "":
         return None
-    user_input: List[str] = raw_input.split(" ")
+    # peel off only the leading tokens; the rest of the input is the comment
+    duration_str, _, entry_args = raw_input.partition(" ")
+    first_arg, _, after_first = entry_args.partition(" ")
+    second_arg, _, after_second = after_first.partition(" ")
     try:
-        duration = float(user_input[0])
+        duration = float(duration_str)
     except ValueError as err:
         raise dc.InputError(err)
     if math.isnan(duration):
@@ -869,46 +1038,36 @@ def _parse_time_entry(console: ConsoleSession, raw_input: str) -> Optional[TimeE
     if duration < 0:
         raise dc.InputError("You can't unwork.")
     new_entry = TimeEntry(duration)
-    #  time_entry_arguments: dict = {"duration": duration}
-    entry_args: List[str] = user_input[1:]
-    match entry_args:
-        # No arguments, add entry with all defaults
-        case ([] | "" | None):
+    # Duration only, add entry with all defaults
+    if not entry_args:
+        return new_entry
+    categories: dict = console.config.category_list
+    tasks: dict = console.config.task_list
+    # Convert a possible category key once, rather than in each branch
+    first_is_float: bool = is_float(first_arg)
+    cat_int: Optional[int] = None
+    if first_is_float:
+        try:
+            cat_int = int(first_arg)
+        except ValueError:
             pass
-        # All arguments including comment
-        case (str(cat_key), str(task), *comment) if (
-            is_float(cat_key)
-            and int(cat_key) in console.config.category_list.keys()
-            and task.lower() in console.config.task_list.keys()
-        ):
-            new_entry.category = int(cat_key)
-            new_entry.task = task
-            if comment:
-                new_entry.comment = " ".join(comment).strip()
-        # Category argument, no task argument
-        case (str(cat_key), *comment) if (
-            is_float(cat_key) and int(cat_key) in console.config.category_list.keys()
-        ):
-            new_entry.category = int(cat_key)
-            if comment:
-                new_entry.comment = " ".join(comment).strip()
-        # task argument, no category argument
-        case (str(task), *comment) if (
-            not is_float(task) and task.lower() in console.config.task_list.keys()
-        ):
-            new_entry.task = task
-            if comment:
-                new_entry.comment = " ".join(comment).strip()
-        # Comment only
-        case (str(cat_key), str(task), *comment) if (
-            not is_float(cat_key)
-            and task.lower() not in console.config.task_list.keys()
-        ):
-            new_comment: str = (cat_key + " " + task + " " + " ".join(comment)).strip()
-            if new_comment:
-                new_entry.comment = "".join(new_comment).strip()
-        case comment:
-            new_entry.comment = " ".join(comment).strip()
+    # Each case picks out the remaining text to use as the comment
+    comment: str = entry_args
+    # All arguments including comment
+    if cat_int in categories and second_arg.lower() in tasks:
+        new_entry.category = cat_int
+        new_entry.task = second_arg
+        comment = after_second
+    # Category argument, no task argument
+    elif cat_int in categories:
+        new_entry.category = cat_int
+        comment = after_first
+    # task argument, no category argument
+    elif not first_is_float and first_arg.lower() in tasks:
+        new_entry.task = first_arg
+        comment = after_first
+    # Comment only: the whole input is the comment
+    new_entry.comment = comment.strip()
 
     return new_entry
 
@@ -952,7 +1111,7 @@ def _end_timed_activity(cs: ConsoleSession, user_args: argparse.Namespace) -> No
         AND s.input_type = 'command'
         ORDER BY l.id DESC limit 1
     """
-    cursor = cs.db_connection.cursor()
+    cursor = cs.cursor
     cursor.execute(query_last_zero_entry)
     last_entry = cursor.fetchone()
 
@@ -978,7 +1137,7 @@ def _end_timed_activity(cs: ConsoleSession, user_args: argparse.Namespace) -> No
     category_id = fetch_first(cursor)
 
     # convert timestamp stored in database to datetime object
-    start_ts = datetime.datetime.strptime(start_ts, "%Y-%m-%d %X.%f")
+    start_ts = datetime.datetime.fromisoformat(start_ts)
 
     # use 0 duration for _parse_time entry
     input_str = "0 " + " ".join(user_args)
@@ -1034,9 +1193,18 @@ def _end_timed_activity(cs: ConsoleSession, user_args: argparse.Namespace) -> No
 def parse_args() -> argparse.Namespace:
     """Initialize the argument parser and available command line arguments.
     Return the argument namespace."""
+    args = _get_parser(OUTLOOK_ENABLED).parse_args()
+
+    return args
+
+
+@functools.lru_cache(maxsize=2)
+def _get_parser(outlook_enabled: bool) -> argparse.ArgumentParser:
+    """Build the argument parser. Only built once for each
+    value of outlook_enabled."""
     parser = argparse.ArgumentParser(description=WELCOME_MSG)
     group = parser.add_mutually_exclusive_group()
-    if OUTLOOK_ENABLED:
+    if outlook_enabled:
         group.add_argument(
             "--outlook", "-o", action="store_true", help="start titr in outlook mode"
         )
@@ -1059,13 +1227,8 @@ def parse_args() -> argparse.Namespace:
         metavar="category task comment",
         help="Stop timing your work.",
     )
-    args = parser.parse_args()
-
-    return args
-
 
-def _sum_grouped_tasks(tasks: list[tuple[str, float, str]]) -> float:
-    return sum((item[1] for item in tasks))
+    return parser
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import argparse
+import os
 import sqlite3
 from os import PathLike
 from typing import Optional
@@ -29,14 +30,14 @@ def find_conflicts(
     ):
         print(f"Checking for conflicts between '{master_db}' and '{conflict_db}'...")
 
-    # Connect to databases
+    # Connect to the master database, and attach the conflict database to it
+    # so that rows can be compared by sqlite rather than in python
     conn1 = sqlite3.connect(master_db)
-    conn2 = sqlite3.connect(conflict_db)
     cursor1 = conn1.cursor()
-    cursor2 = conn2.cursor()
+    cursor1.execute("ATTACH DATABASE ? AS conflict_db", (os.fsdecode(conflict_db),))
 
     # Get table names
-    cursor1.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    cursor1.execute("SELECT name FROM main.sqlite_master WHERE type='table'")
     tables1 = cursor1.fetchall()
 
     # Find conflicts in each table
@@ -44,7 +45,7 @@ def find_conflicts(
         table_name = table1[0]
 
         # Get primary key column name
-        cursor1.execute(f"PRAGMA table_info({table_name})")
+        cursor1.execute(f"PRAGMA main.table_info({table_name})")
         table_info1 = cursor1.fetchall()
         primary_key_col: Optional[int] = None
         for col_info in table_info1:
@@ -56,34 +57,39 @@ def find_conflicts(
             continue
 
         # Get maximum value in primary key column for conflict database
-        cursor2.execute(f"SELECT MAX({primary_key_col}) FROM {table_name}")
-        max_id2 = cursor2.fetchone()[0]
+        cursor1.execute(f"SELECT MAX({primary_key_col}) FROM conflict_db.{table_name}")
+        max_id2 = cursor1.fetchone()[0]
 
         if max_id2 is None:
             continue
 
-        # Find conflicts in primary key column
-        for row_id in range(max_id2, max_id2 - 500, -1):
-            cursor_start = conn1.cursor()
-            cursor_search = conn2.cursor()
-            cursor_start.execute(
-                f"SELECT * FROM {table_name} WHERE {primary_key_col} = ?", (row_id,)
-            )
-            row_start = cursor_start.fetchone()
-            cursor_search.execute(
-                f"SELECT * FROM {table_name} WHERE {primary_key_col} = ?", (row_id,)
-            )
-            row_search = cursor_search.fetchone()
-
-            if row_start != row_search:
-                if table_name not in conflicts:
-                    conflicts[table_name] = []
-                conflicts[table_name].append(row_id)
+        # Find conflicts among the last 500 rows of the conflict database:
+        # any row that is missing from, or different in, the other database.
+        # Rows can only be equal if both tables have the same number of columns.
+        cursor1.execute(f"PRAGMA conflict_db.table_info({table_name})")
+        same_columns: bool = len(cursor1.fetchall()) == len(table_info1)
+        columns: str = "*" if same_columns else primary_key_col
+        master_rows, conflict_rows = (
+            f"SELECT {columns} FROM {schema}.{table_name} "
+            f"WHERE {primary_key_col} > :low AND {primary_key_col} <= :high"
+            for schema in ("main", "conflict_db")
+        )
+        if same_columns:
+            find_conflict_ids = f"""--sql
+                SELECT {primary_key_col} FROM ({master_rows} EXCEPT {conflict_rows})
+                UNION
+                SELECT {primary_key_col} FROM ({conflict_rows} EXCEPT {master_rows})
+                ORDER BY 1 DESC
+            """
+        else:
+            find_conflict_ids = f"{master_rows} UNION {conflict_rows} ORDER BY 1 DESC"
+        cursor1.execute(find_conflict_ids, {"low": max_id2 - 500, "high": max_id2})
+        conflict_ids = [row[0] for row in cursor1]
+        if conflict_ids:
+            conflicts[table_name] = conflict_ids
 
     cursor1.close()
-    cursor2.close()
     conn1.close()
-    conn2.close()
 
     return conflicts
 
@@ -121,12 +127,29 @@ def resolve_conflicts(
     # Find conflicts between master and conflict databases
     conflicts = find_conflicts(master_db, conflict_db)
 
+    # Read all of the conflicting rows that may be copied up front,
+    # rather than one query per row
+    tables = ("time_log", "categories", "tasks", "sessions")
+    conflict_rows: dict[str, dict[int, tuple]] = {
+        table: _fetch_rows(conflict_cursor, table, conflicts.get(table, []))
+        for table in tables
+    }
+    copied_keys: dict[str, list[int]] = {table: [] for table in tables}
+    # column names and insert statements, read once for this run
+    table_schema: dict[str, tuple] = {}
+
     # Iterate through each conflict in the time_log table
     for primary_key in conflicts.get("time_log", []):
         # Copy the conflict entry from conflict_db to master_db
         new_key = update_table_for_conflict(
-            master_cursor, conflict_cursor, "time_log", primary_key
+            master_cursor,
+            conflict_cursor,
+            "time_log",
+            primary_key,
+            conflict_rows["time_log"][primary_key],
+            table_schema,
         )
+        copied_keys["time_log"].append(primary_key)
         print(f"Updating time_log duplicating primary key id {primary_key}...")
 
         # Check if category_id, task_id, and session_id are also conflicts
@@ -141,15 +164,28 @@ def resolve_conflicts(
             reference_id = master_cursor.fetchone()[0]
             if reference_id in conflicts.get(table, []):
                 new_id = update_table_for_conflict(
-                    master_cursor, conflict_cursor, table, reference_id
+                    master_cursor,
+                    conflict_cursor,
+                    table,
+                    reference_id,
+                    conflict_rows[table][reference_id],
+                    table_schema,
                 )
+                copied_keys[table].append(reference_id)
                 master_cursor.execute(
                     f"UPDATE time_log SET {column_name}=? WHERE id=?", (new_id, new_key)
                 )
                 conflicts[table].remove(reference_id)
 
+    # Remove the copied rows from the conflict database
+    for table, keys in copied_keys.items():
+        conflict_cursor.executemany(
+            f"DELETE FROM {table} WHERE id = ?", [(key,) for key in keys]
+        )
+
     # Commit changes and close connections
     master_conn.commit()
+    conflict_conn.commit()
     master_conn.close()
     conflict_conn.close()
 
@@ -159,6 +195,8 @@ def update_table_for_conflict(
     conflict_cursor: sqlite3.Cursor,
     table_name: str,
     conflict_key: int,
+    conflict_row: Optional[tuple] = None,
+    table_schema: Optional[dict[str, tuple]] = None,
 ) -> Optional[int]:
     """
     Given sqlite3 cursors for a master database and a conflicting database, along with
@@ -166,28 +204,40 @@ def update_table_for_conflict(
     data, make a copy of the data from the conflicting database into the master database.
     If any columns are missing from the conflicting database due to an updated schema, simply
     fill those columns in the master database with None values. The new entry in the master
-    database should have an autogenerated primary key.
+    database should have an autogenerated primary key. The conflicting row is not removed
+    from the conflicting database, or committed to either database.
 
     Args:
         master_cursor (sqlite3.Cursor): Cursor object for the master database.
         conflict_cursor (sqlite3.Cursor): Cursor object for the conflicting database.
         table_name (str): Name of the table that exists in both databases.
         conflict_key (int): Primary key of the conflicting data.
+        conflict_row (Optional[tuple]): The conflicting row, if already fetched.
+        table_schema (Optional[dict[str, tuple]]): Column names and insert statements of
+            each table, filled in on first use. Pass the same dict for every conflict in
+            a run to only read each table's schema once.
 
     Returns:
         int: The primary key of the new entry in the master database.
     """
     print(f"Updating {table_name} primary key id {conflict_key}...")
     # Fetch the conflicting row from the conflict database
-    conflict_cursor.execute(f"SELECT * FROM {table_name} WHERE id=?", (conflict_key,))
-    conflict_row = conflict_cursor.fetchone()
+    if conflict_row is None:
+        conflict_row = _fetch_rows(conflict_cursor, table_name, [conflict_key])[
+            conflict_key
+        ]
 
     # Get the column names of the table in both master and conflict databases
-    master_cursor.execute(f"PRAGMA table_info({table_name})")
-    master_columns = [col[1] for col in master_cursor.fetchall()]
-
-    conflict_cursor.execute(f"PRAGMA table_info({table_name})")
-    conflict_columns = [col[1] for col in conflict_cursor.fetchall()]
+    if table_schema is None:
+        table_schema = {}
+    if table_name not in table_schema:
+        master_columns = _column_names(master_cursor, table_name)
+        table_schema[table_name] = (
+            master_columns,
+            _column_names(conflict_cursor, table_name),
+            _insert_statement(table_name, master_columns),
+        )
+    master_columns, conflict_columns, insert_statement = table_schema[table_name]
 
     # Fill any missing columns in the conflict row with None values
     for column in master_columns:
@@ -199,20 +249,38 @@ def update_table_for_conflict(
     # column_names = ', '.join([column for column in conflict_row._fields[1:]])
     # new_values = ', '.join(placeholders)
     # master_cursor.execute(f"INSERT INTO {table_name} ({column_names}) VALUES ({new_values})", conflict_row[1:])
-    placeholders = ["?"] * len(master_columns[1:])
-    new_values = ", ".join(placeholders)
-    master_cursor.execute(
-        f"INSERT INTO {table_name} ({', '.join(master_columns[1:])}) VALUES ({new_values})",
-        conflict_row[1:],
-    )
+    master_cursor.execute(insert_statement, conflict_row[1:])
     # master_cursor.execute(f"INSERT INTO {table_name} VALUES ({new_values})", conflict_row)
-    conflict_cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (conflict_key,))
-    conflict_cursor.connection.commit()
     new_key = master_cursor.lastrowid
 
     return new_key
 
 
+def _fetch_rows(
+    cursor: sqlite3.Cursor, table_name: str, keys: list[int]
+) -> dict[int, tuple]:
+    """Fetch rows from a table with a single query, keyed by id."""
+    cursor.execute(
+        f"SELECT * FROM {table_name} WHERE id IN ({', '.join('?' * len(keys))})", keys
+    )
+    return {row[0]: row for row in cursor}
+
+
+def _column_names(cursor: sqlite3.Cursor, table_name: str) -> tuple[str, ...]:
+    """Get the column names of a table."""
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    return tuple(col[1] for col in cursor.fetchall())
+
+
+def _insert_statement(table_name: str, master_columns: tuple[str, ...]) -> str:
+    """Build the statement inserting a row with an autogenerated primary key."""
+    columns = master_columns[1:]
+    return (
+        f"INSERT INTO {table_name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+
+
 def main():
     # Create an ArgumentParser object
     parser = argparse.ArgumentParser(description="titr database deconflicter.\
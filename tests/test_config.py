@@ -1,3 +1,4 @@
+import os
 import pytest
 import configparser
 
@@ -32,12 +33,57 @@ def test_load_config(titr_default_config, console, monkeypatch):
     console.config = load_config(config_file="none")
     assert console.config.category_list[2] == "Deep Work"
     assert console.config.category_list[3] == "Email"
+    assert console.config.category_by_name["Email"] == 3
     assert console.config.task_list["i"] == "Incidental"
     assert console.config.task_list["d"] == "Default Task"
     assert console.config.default_task == "i"
     assert console.config.default_category == 2
     assert console.config.skip_all_day_events is True
-    assert console.config.skip_event_status == [0, 3]
+    assert console.config.skip_event_status == {0, 3}
     assert console.config.incidental_tasks == ["i"]
-    assert console.config.skip_event_names == ["Lunch", "Meeting"]
+    assert console.config.skip_event_names == {"Lunch", "Meeting"}
     configparser.ConfigParser()
+
+
+def test_load_config_cache(titr_default_config):
+    first_config = load_config(titr_default_config)
+    second_config = load_config(titr_default_config)
+    assert first_config == second_config
+    # Modifying a loaded config must not affect the cache
+    assert first_config is not second_config
+    first_config.task_list["z"] = "modified"
+    assert "z" not in load_config(titr_default_config).task_list
+
+    # Changes to the file are picked up
+    test_config = configparser.ConfigParser()
+    test_config.read(titr_default_config)
+    test_config.set("tasks", "z", "new task")
+    with open(titr_default_config, "w") as cfg_fh:
+        test_config.write(cfg_fh)
+    assert load_config(titr_default_config).task_list["z"] == "new task"
+
+
+def test_load_config_file_cache(titr_default_config, monkeypatch, capsys):
+    config = load_config(titr_default_config)
+    cache_file = f"{titr_default_config}.cache"
+    assert os.path.isfile(cache_file)
+    warnings = capsys.readouterr().out
+    assert "Skipped task key long_key" in warnings
+
+    # A new process reads the pickled config instead of parsing the file
+    titr.config._parse_config.cache_clear()
+
+    def _fail_parse(*_):
+        raise AssertionError("config file parsed")
+
+    with monkeypatch.context() as mp:
+        mp.setattr(titr.config, "_read_config_file", _fail_parse)
+        assert load_config(titr_default_config) == config
+    # warnings are shown again for the cached config
+    assert capsys.readouterr().out == warnings
+
+    # A corrupt cache is ignored
+    titr.config._parse_config.cache_clear()
+    with open(cache_file, "wb") as cache_fh:
+        cache_fh.write(b"not a pickle")
+    assert load_config(titr_default_config) == config
@@ -1,12 +1,15 @@
+import datetime
 import os
 import pytest
 
 
 from dataclasses import dataclass
+import titr.database
 from titr.titr_main import (
     fetch_first,
     db_session_metadata,
     db_populate_task_category_lists,
+    db_populate_user_table,
     db_write_time_log,
     TimeEntry,
 )
@@ -23,11 +26,18 @@ def test_session_metadata(db_connection, monkeypatch):
     platforms: list = "linux windows other".split(" ")
     monkeypatch.setattr("os.uname", lambda: MockUname(), raising=False)
     monkeypatch.setattr("os.getlogin", lambda: "windows_user")
-    for session_id, platform in enumerate(platforms):
+    cursor = db_connection.cursor()
+    for session_id, (platform, user) in enumerate(
+        zip(platforms, ["windows_user", "windows_user", None])
+    ):
         monkeypatch.setattr("sys.platform", platform)
+        titr.database._session_user.cache_clear()
         assert (
             db_session_metadata(db_connection, input_type="test", test_flag=True) == session_id + 1
         )
+        cursor.execute("SELECT user, platform FROM sessions WHERE id = (?)", [session_id + 1])
+        assert cursor.fetchone() == (user, platform)
+    titr.database._session_user.cache_clear()
 
 
 @pytest.mark.parametrize(
@@ -97,3 +107,97 @@ def test_write_time_log(console):
         ]
     ):
         assert db_entry[index] == data
+
+
+def test_write_time_log_batch(console):
+    db_populate_task_category_lists(console)
+    for duration in [1, 2, 3]:
+        console.add_entry(TimeEntry(duration, category=3, task="d"))
+    db_write_time_log(console, 1)
+
+    # Update the second entry in place
+    console.time_entries = []
+    console.add_entry(TimeEntry(5, category=4, task="i", time_log_id=2))
+    db_write_time_log(console, 2)
+
+    cursor = console.db_connection.cursor()
+    cursor.execute(
+        """--sql
+        SELECT l.id, l.duration, c.user_key, t.user_key, l.session_id
+        FROM time_log l
+        JOIN tasks t ON t.id=l.task_id
+        JOIN categories c ON c.id=l.category_id
+        ORDER BY l.id
+    """
+    )
+    assert cursor.fetchall() == [
+        (1, 1, "3", "d", 1),
+        (2, 5, "4", "i", 2),
+        (3, 3, "3", "d", 1),
+    ]
+
+
+def test_populate_tables_unique_keys(console):
+    db_populate_task_category_lists(console)
+    cursor = console.db_connection.cursor()
+    cursor.execute("SELECT id, user_key, name FROM tasks ORDER BY id")
+    initial_tasks = cursor.fetchall()
+    assert [row[1:] for row in initial_tasks] == list(console.config.task_list.items())
+
+    # Repopulating is idempotent
+    db_populate_task_category_lists(console)
+    cursor.execute("SELECT id, user_key, name FROM tasks ORDER BY id")
+    assert cursor.fetchall() == initial_tasks
+
+    # Reassigning a key to a new task clears it from the old one
+    console.config.task_list = {"i": "New Task"}
+    db_populate_task_category_lists(console)
+    cursor.execute("SELECT name FROM tasks WHERE user_key='i'")
+    assert cursor.fetchall() == [("New Task",)]
+    cursor.execute("SELECT user_key FROM tasks WHERE name='Incidental'")
+    assert cursor.fetchall() == [(None,)]
+
+
+def test_populate_user_table(db_connection):
+    new_id = db_populate_user_table(db_connection, "tasks", "New Task", user_key="n")
+    cursor = db_connection.cursor()
+    cursor.execute("SELECT id, user_key FROM tasks WHERE name='New Task'")
+    assert cursor.fetchall() == [(new_id, "n")]
+
+    # Existing names keep their id
+    assert db_populate_user_table(db_connection, "tasks", "New Task") == new_id
+    assert db_populate_user_table(db_connection, "tasks", "Other Task") == new_id + 1
+
+
+def test_time_log_index(db_connection):
+    cursor = db_connection.cursor()
+    cursor.execute("PRAGMA index_list(time_log)")
+    assert "idx_time_log_date_task" in [index[1] for index in cursor.fetchall()]
+    cursor.execute("EXPLAIN QUERY PLAN SELECT task_id FROM time_log WHERE date >= '2022-01-01'")
+    assert "idx_time_log_date_task" in cursor.fetchone()[3]
+
+
+def test_open_entry_index(db_connection):
+    cursor = db_connection.cursor()
+    cursor.execute(
+        """--sql
+        EXPLAIN QUERY PLAN SELECT l.id FROM time_log l
+        WHERE l.duration = 0 AND l.end_ts IS NULL
+        ORDER BY l.id DESC LIMIT 1
+    """
+    )
+    assert "idx_time_log_open" in cursor.fetchone()[3]
+
+
+def test_write_timestamps(console):
+    db_populate_task_category_lists(console)
+    start_ts = datetime.datetime(2022, 8, 1, 9, 30)  # no microseconds
+    end_ts = datetime.datetime(2022, 8, 1, 10, 15, 0, 123456)
+    console.add_entry(TimeEntry(0.75, start_ts=start_ts, end_ts=end_ts))
+    db_write_time_log(console, 1)
+
+    cursor = console.db_connection.cursor()
+    cursor.execute("SELECT start_ts, end_ts FROM time_log")
+    db_start, db_end = cursor.fetchone()
+    assert datetime.datetime.fromisoformat(db_start) == start_ts
+    assert datetime.datetime.fromisoformat(db_end) == end_ts
@@ -0,0 +1,119 @@
+import sqlite3
+
+import pytest
+
+from titr.database import SCHEMA_SQL
+from utilities.database_deconflicter import (
+    find_conflicts,
+    resolve_conflicts,
+    update_table_for_conflict,
+)
+
+
+def _create_db(db_path, categories, time_log):
+    db_connection = sqlite3.connect(db_path)
+    db_connection.executescript(SCHEMA_SQL)
+    db_connection.executemany("INSERT INTO categories (id, name) VALUES (?, ?)", categories)
+    db_connection.executemany(
+        "INSERT INTO time_log (id, duration, category_id, comment) VALUES (?, ?, ?, ?)", time_log
+    )
+    db_connection.commit()
+    db_connection.close()
+
+
+@pytest.fixture
+def db_files(tmp_path):
+    master_db, conflict_db = tmp_path / "master.db", tmp_path / "conflict.db"
+    _create_db(
+        master_db,
+        [(1, "Email"), (2, "Deep Work")],
+        [(1, 1.0, 1, "same"), (2, 2.0, 2, "master"), (3, 0.5, 1, "master only")],
+    )
+    _create_db(
+        conflict_db,
+        [(1, "Email"), (2, "Meetings")],
+        [(1, 1.0, 1, "same"), (2, 2.5, 2, "conflict")],
+    )
+    yield master_db, conflict_db
+
+
+def test_find_conflicts(db_files):
+    master_db, conflict_db = db_files
+    assert find_conflicts(master_db, master_db) == {}
+    # rows past the last row of the conflict database are not compared
+    assert find_conflicts(master_db, conflict_db) == {"time_log": [2], "categories": [2]}
+
+    db_connection = sqlite3.connect(master_db)
+    db_connection.execute("DELETE FROM time_log WHERE id = 1")
+    db_connection.commit()
+    db_connection.close()
+    assert find_conflicts(master_db, conflict_db) == {"time_log": [2, 1], "categories": [2]}
+
+
+def test_find_conflicts_new_column(db_files):
+    master_db, conflict_db = db_files
+    db_connection = sqlite3.connect(master_db)
+    db_connection.execute("ALTER TABLE categories ADD COLUMN color TEXT")
+    db_connection.close()
+    # rows can't match when the schema is different
+    assert find_conflicts(master_db, conflict_db)["categories"] == [2, 1]
+
+
+def test_resolve_conflicts(db_files):
+    master_db, conflict_db = db_files
+    resolve_conflicts(master_db, conflict_db)
+
+    master_connection = sqlite3.connect(master_db)
+    assert master_connection.execute(
+        "SELECT l.id, l.duration, c.name, l.comment FROM time_log l "
+        "JOIN categories c ON c.id = l.category_id ORDER BY l.id"
+    ).fetchall() == [
+        (1, 1.0, "Email", "same"),
+        (2, 2.0, "Deep Work", "master"),
+        (3, 0.5, "Email", "master only"),
+        (4, 2.5, "Meetings", "conflict"),
+    ]
+    master_connection.close()
+
+    # copied rows are removed from the conflict database
+    conflict_connection = sqlite3.connect(conflict_db)
+    assert conflict_connection.execute("SELECT id FROM time_log").fetchall() == [(1,)]
+    assert conflict_connection.execute("SELECT id FROM categories").fetchall() == [(1,)]
+    conflict_connection.close()
+    assert find_conflicts(master_db, conflict_db) == {}
+
+
+def test_update_table_for_conflict(db_files):
+    master_db, conflict_db = db_files
+    master_connection = sqlite3.connect(master_db)
+    master_connection.execute("ALTER TABLE categories ADD COLUMN color TEXT")
+    conflict_connection = sqlite3.connect(conflict_db)
+    master_cursor, conflict_cursor = master_connection.cursor(), conflict_connection.cursor()
+
+    table_schema: dict = {}
+    new_key = update_table_for_conflict(
+        master_cursor, conflict_cursor, "categories", 2, table_schema=table_schema
+    )
+    assert new_key == 3
+    # missing columns are filled with None
+    assert master_cursor.execute("SELECT * FROM categories WHERE id = 3").fetchone() == (
+        3,
+        None,
+        "Meetings",
+        None,
+    )
+    assert table_schema["categories"][0] == ("id", "user_key", "name", "color")
+    assert table_schema["categories"][1] == ("id", "user_key", "name")
+
+    # the schema is only read for the first conflict in each table
+    categories_schema = table_schema["categories"]
+    new_key = update_table_for_conflict(
+        master_cursor, conflict_cursor, "categories", 1, table_schema=table_schema
+    )
+    assert new_key == 4
+    assert table_schema["categories"] is categories_schema
+
+    # conflicting rows are left in place until the caller removes them
+    assert conflict_cursor.execute("SELECT count(*) FROM categories").fetchone() == (2,)
+    master_connection.close()
+    conflict_connection.close()
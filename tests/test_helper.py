@@ -22,6 +22,15 @@ from titr.helper import is_float
         (-4.23e-5, True),
         (False, True),
         ("NaN", True),
+        ("-inf", True),
+        ("Infinity", True),
+        (" 7 ", True),
+        ("1_000", True),
+        ("1.", True),
+        ("", False),
+        ("import", False),
+        ("-", False),
+        ("1.2.3", False),
     ],
 )
 def test_is_float(item, expected):
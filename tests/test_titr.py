@@ -57,9 +57,13 @@ def db_connection(monkeypatch):
 @pytest.fixture
 def console(monkeypatch, db_connection, titr_default_config):
     monkeypatch.setattr("titr.database.db_initialize", lambda **_: db_connection)
+    # never read or cache the user's own config file
+    monkeypatch.setattr(
+        "titr.titr_main.load_config",
+        lambda config_file=titr_default_config: load_config(config_file),
+    )
 
     cs = ConsoleSession(database_file=":memory:")
-    cs.config = load_config(titr_default_config)
 
     yield cs
 
@@ -270,6 +274,19 @@ def test_time_entry(console):
     assert te.comment == ""
 
 
+@pytest.mark.parametrize("comment", [None, "", "short comment", "a much longer comment " * 4])
+def test_time_entry_str(comment):
+    te = TimeEntry(2, date=datetime.date(2022, 8, 1), comment=comment)
+    lines = str(te).split("\n")
+    assert lines[0].startswith("2022-08-01  2.00")
+    assert all(len(line) <= sum(titr.TIME_ENTRY_COL_WIDTHS) for line in lines)
+    # comments start in the last column, and only wrap when too long for it
+    assert lines[0][sum(titr.TIME_ENTRY_COL_WIDTHS[:4]) :].rstrip() == (comment or "")[:24].strip()
+    assert len(lines) == (1 if len(comment or "") <= 24 else 3)
+    # rendering again uses the cached string
+    assert str(te) is str(te)
+
+
 def test_clear(console, time_entry):
     console.time_entries = [time_entry, time_entry]
     titr.titr_main.clear_entries(console)
@@ -292,18 +309,6 @@ def test_outlook_entry_pattern(user_input, expected, monkeypatch):
     assert titr.titr_main.outlook_entry_pattern(user_input) == expected
 
 
-@pytest.mark.parametrize(
-    "tasks, expected_sum",
-    [
-        ([("titr", 17.0, "t"), ("datum", 5.0, "d"), ("incidental", 3.5, "i")], 25.5),
-        ([], 0),
-        ((("titr", 17.0, "t"), ("datum", 5.0, "d"), ("incidental", 3.5, "i")), 25.5),
-    ],
-)
-def test_sum_grouped_tasks(tasks, expected_sum):
-    assert titr.titr_main._sum_grouped_tasks(tasks) == expected_sum
-
-
 @pytest.mark.xfail(reason="work in progress")
 @pytest.mark.parametrize(
     "inputs, expected",
@@ -325,12 +330,22 @@ def test_daily_log(console):
     console.add_entry(e1)
     e2 = TimeEntry(5, category=3)
     console.add_entry(e2)
+    # entries outside of the current week are ignored
+    console.add_entry(TimeEntry(3, category=4, date=datetime.date(2020, 8, 6)))
     titr.titr_main.write_db(console)
 
     log = titr.titr_main.show_today_log(console, test_flag=True)
     assert log["Duration"].sum() == 6
 
 
+def test_format_today_log_entry():
+    row = titr.titr_main._format_today_log_entry(
+        1.5, "Professional Development Course", "Default Task", "c"
+    )
+    # long names are shortened to keep the columns separate
+    assert row == "1.50      Professional [...]    Default Task          c"
+
+
 def test_work_modes(console):
     # Check for no-data case
     assert titr.titr_main.work_modes(console, test_flag=True) is None
@@ -339,6 +354,8 @@ def test_work_modes(console):
     console.add_entry(e1)
     e2 = TimeEntry(5, category=3)
     console.add_entry(e2)
+    # entries outside of the current week are ignored
+    console.add_entry(TimeEntry(3, category=4, date=datetime.date(2020, 8, 6)))
     titr.titr_main.write_db(console)
     titr.titr_main.preview_output(console)
 
@@ -347,9 +364,13 @@ def test_work_modes(console):
     assert modes["percent"].sum() == 1
 
 
-def test_main(monkeypatch, capsys):
+def test_main(monkeypatch, capsys, titr_default_config):
     # setup
     monkeypatch.setattr("builtins.input", lambda _: "q")
+    monkeypatch.setattr(
+        "titr.titr_main.load_config",
+        lambda config_file=titr_default_config: load_config(config_file),
+    )
 
     @dataclass
     class MockArgs:
@@ -470,6 +491,7 @@ def test_parse_args(monkeypatch, sys_args, valid):
             TimeEntry(0, comment="no entry", category=2, task="i"),
         ),
         ("0", TimeEntry(0)),
+        ("1 2.5 i", TimeEntry(1, comment="2.5 i")),
         ("", None),
     ],
 )
@@ -526,6 +548,9 @@ def test_add_entry(console, monkeypatch):
         ("not a date", None),
         ("6/17/84", None),
         ("2121-04-23", None),
+        ("+0", datetime.date.today()),
+        ("+1", None),
+        ("--1", None),
     ],
 )
 def test_set_date(console, test_input, expected, monkeypatch):
@@ -537,3 +562,80 @@ def test_set_date(console, test_input, expected, monkeypatch):
 
         with pytest.raises(titr.datum_console.InputError):
             titr.titr_main.set_date(console, test_input)
+
+
+def test_import_csv(console, tmp_path, monkeypatch):
+    csv_file = tmp_path / "import.csv"
+    csv_file.write_text(
+        "Date,Duration,Task,Category,Comment\n"
+        "6/17/2022,1.5,Incidental,Email,first entry\n"
+        "6/18/2022,2,New Task,Deep Work,second entry\n"
+        "not a date,2,New Task,Deep Work,bad date\n"
+        "6/19/2022,lots,New Task,Deep Work,bad duration\n"
+        "\n"
+        "6/19/2022,3,New Task\n"
+        "6/20/2022,0.5,Incidental,New Category,third entry\n"
+    )
+    assert titr.titr_main.import_from_csv(console, tmp_path / "missing.csv") == 0
+
+    # nothing is written unless the import is confirmed
+    monkeypatch.setattr("builtins.input", lambda _: "n")
+    assert titr.titr_main.import_from_csv(console, csv_file, header_row=1) == 3
+    cursor = console.db_connection.cursor()
+    cursor.execute("SELECT count(*) FROM time_log")
+    assert cursor.fetchone() == (0,)
+
+    monkeypatch.setattr("builtins.input", lambda _: "y")
+    # write in chunks and rebuild the time log indexes as for a large import
+    monkeypatch.setattr("titr.titr_main.IMPORT_INDEX_REBUILD_ROWS", 2)
+    monkeypatch.setattr("titr.titr_main.IMPORT_CHUNK_ROWS", 2)
+    assert titr.titr_main.import_from_csv(console, csv_file, header_row=1) == 3
+
+    cursor.execute(
+        """--sql
+        SELECT l.date, l.duration, t.name, c.name, l.comment FROM time_log l
+        JOIN tasks t ON t.id = l.task_id
+        JOIN categories c ON c.id = l.category_id
+        ORDER BY l.id
+    """
+    )
+    assert cursor.fetchall() == [
+        ("2022-06-17", 1.5, "Incidental", "Email", "first entry"),
+        ("2022-06-18", 2.0, "New Task", "Deep Work", "second entry"),
+        ("2022-06-20", 0.5, "Incidental", "New Category", "third entry"),
+    ]
+    cursor.execute("PRAGMA index_list(time_log)")
+    assert set(titr.database.TIME_LOG_INDEXES) <= {index[1] for index in cursor.fetchall()}
+    cursor.execute("SELECT count(*) FROM sqlite_stat1 WHERE tbl = 'time_log'")
+    assert cursor.fetchone()[0] > 0
+    # existing tasks keep their user keys
+    cursor.execute("SELECT user_key FROM tasks WHERE name = 'Incidental'")
+    assert cursor.fetchall() == [("i",)]
+
+    # an interrupted import is rolled back
+    def _interrupt(_):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr("builtins.input", _interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        titr.titr_main.import_from_csv(console, csv_file, header_row=1)
+    assert not console.db_connection.in_transaction
+    cursor.execute("SELECT count(*) FROM time_log")
+    assert cursor.fetchone() == (3,)
+    cursor.execute("PRAGMA index_list(time_log)")
+    assert set(titr.database.TIME_LOG_INDEXES) <= {index[1] for index in cursor.fetchall()}
+
+
+def test_export_csv(console, tmp_path):
+    export_file = tmp_path / "export.csv"
+    assert titr.titr_main.export_to_csv(console, export_file) == 0
+    assert not export_file.exists()
+
+    for duration in [1, 2, 3]:
+        console.add_entry(TimeEntry(duration, category=3, task="d", comment="exported"))
+    titr.titr_main.write_db(console)
+    assert titr.titr_main.export_to_csv(console, export_file) == 3
+    exported_rows = export_file.read_text().splitlines()
+    assert exported_rows[0] == "Date,Duration,Task,Category,Comment"
+    assert len(exported_rows) == 4
+    assert exported_rows[-1].endswith(",3.0,Default Task,Email,exported")